@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from config import settings
+from agents.llm_client import LLMClient
+from agents.validation_agent import ValidationAgent
+from agents.ocr_agent import OCRAgent
+from agents.extraction_agent import ExtractionAgent
+from agents.qa_enrichment import EnrichmentAgent, QAAgent
+from agents.directory_agent import DirectoryManagementAgent
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+AGENT_NAMES = ("llm", "validator", "enricher", "qa", "ocr", "extractor", "directory")
+
+
+class AgentRegistry:
+    """
+    One instance of each agent per worker process, created lazily on first use and reused by
+    every task that process runs. Load times are kept locally and published to a Redis hash.
+    """
+    def __init__(self, redis_url: str = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.key = "agents:warmup"
+        self._agents = {}
+        self._timings = {}
+        self._locks = {name: threading.Lock() for name in AGENT_NAMES}
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None and redis:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2, decode_responses=True)
+        return self._redis
+
+    def _create(self, name: str):
+        if name == "llm":
+            return LLMClient()
+        if name == "validator":
+            return ValidationAgent()
+        if name == "enricher":
+            return EnrichmentAgent(llm=self.get("llm"))
+        if name == "qa":
+            return QAAgent()
+        if name == "ocr":
+            return OCRAgent()
+        if name == "extractor":
+            return ExtractionAgent(llm=self.get("llm"))
+        if name == "directory":
+            return DirectoryManagementAgent()
+        raise KeyError(f"Unknown agent: {name}")
+
+    def get(self, name: str):
+        """
+        The process-wide agent; concurrent callers wait for a load already in progress.
+        """
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        with self._locks[name]:
+            if name not in self._agents:
+                started = time.perf_counter()
+                self._agents[name] = self._create(name)
+                self._record(name, "init", time.perf_counter() - started)
+            return self._agents[name]
+
+    def warm_up(self, names=None):
+        """
+        Creates the agents and loads their models up front (PaddleOCR weights, the Ollama model).
+        Returns {name: seconds}.
+        """
+        if names is None:
+            names = [n.strip() for n in settings.AGENT_WARMUP.split(",") if n.strip()]
+        timings = {}
+        for name in names:
+            started = time.perf_counter()
+            try:
+                agent = self.get(name)
+                if hasattr(agent, "warm_up"):
+                    model_started = time.perf_counter()
+                    agent.warm_up()
+                    self._record(name, "model", time.perf_counter() - model_started)
+            except Exception as e:
+                print(f"Warning: warm-up of {name} agent failed: {e}")
+                continue
+            timings[name] = round(time.perf_counter() - started, 4)
+        print(f"Agents ready in worker {os.getpid()}: {timings}")
+        return timings
+
+    def reset(self):
+        """
+        Drops instances inherited from a parent process (sessions and connections are not fork-safe).
+        """
+        self._agents = {}
+        self._timings = {}
+        self._redis = None
+
+    def _record(self, name: str, phase: str, seconds: float):
+        self._timings[f"{name}:{phase}"] = round(seconds, 4)
+        try:
+            client = self._client()
+            if not client:
+                return
+            pipe = client.pipeline()
+            pipe.hset(self.key, f"{name}:{phase}:last_seconds", round(seconds, 4))
+            pipe.hincrbyfloat(self.key, f"{name}:{phase}:total_seconds", seconds)
+            pipe.hincrby(self.key, f"{name}:{phase}:loads", 1)
+            pipe.execute()
+        except Exception as e:
+            print(f"Warning: could not record warm-up metrics: {e}")
+
+    def stats(self):
+        """
+        Warm-up metrics across all workers: per agent/phase loads, last and average load time.
+        """
+        try:
+            raw = self._client().hgetall(self.key) if self._client() else {}
+        except Exception as e:
+            print(f"Warning: could not read warm-up metrics: {e}")
+            raw = {}
+        stats = {}
+        for field, value in raw.items():
+            name, phase, metric = field.rsplit(":", 2)
+            stats.setdefault(name, {}).setdefault(phase, {})[metric] = round(float(value), 4) if metric != "loads" else int(value)
+        for phases in stats.values():
+            for values in phases.values():
+                if values.get("loads"):
+                    values["avg_seconds"] = round(values.get("total_seconds", 0.0) / values["loads"], 4)
+        return {"agents": stats, "process": {"pid": os.getpid(), "loaded": sorted(self._agents), "timings": dict(self._timings)}}
+
+
+agent_registry = AgentRegistry()
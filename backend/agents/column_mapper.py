@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: registry writes are only serialized within a process
+    fcntl = None
+
+TARGET_FIELDS = ["npi", "registration_number", "first_name", "last_name", "full_name", "website"]
+
+# Normalized header spellings seen in provider rosters
+SYNONYMS = {
+    "npi": ["npi", "npi_number", "npi_no", "npi_id", "provider_npi", "national_provider_identifier", "individual_npi"],
+    "registration_number": [
+        "registration_number", "registration_no", "reg_no", "reg_number", "registration_id", "registration",
+        "medical_registration_number", "mci_registration", "license_number", "licence_number", "license_no",
+    ],
+    "first_name": ["first_name", "firstname", "fname", "given_name", "provider_first_name", "first"],
+    "last_name": ["last_name", "lastname", "lname", "surname", "family_name", "provider_last_name", "last"],
+    "full_name": ["full_name", "fullname", "name", "provider_name", "doctor_name", "practitioner_name", "physician_name"],
+    "website": ["website", "website_url", "url", "web", "homepage", "site", "web_address", "clinic_website"],
+}
+
+# Synonyms too generic to match as a header prefix/suffix ("last_updated", "site_id", "registration_date")
+GENERIC_TOKENS = {"first", "last", "name", "site", "registration"}
+
+FUZZY_THRESHOLD = 0.9
+
+
+def normalize_header(header) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(header).strip().lower()).strip("_")
+
+
+def header_fingerprint(columns) -> str:
+    """
+    Order-insensitive identity of a header layout.
+    """
+    normalized = sorted(normalize_header(c) for c in columns)
+    return hashlib.sha1("|".join(normalized).encode("utf-8")).hexdigest()
+
+
+def score_header(header: str, field: str) -> float:
+    """
+    1.0 for a known synonym, 0.9 when the header starts or ends with all tokens of a specific
+    synonym (e.g. "provider_npi_number"), otherwise the best fuzzy ratio against the synonyms.
+    """
+    synonyms = SYNONYMS[field]
+    if header in synonyms:
+        return 1.0
+    tokens = header.split("_")
+    for syn in synonyms:
+        if len(syn) <= 3 or syn in GENERIC_TOKENS:
+            continue
+        syn_tokens = syn.split("_")
+        if len(tokens) > len(syn_tokens) and syn_tokens in (tokens[:len(syn_tokens)], tokens[-len(syn_tokens):]):
+            return 0.9
+    return max(SequenceMatcher(None, header, syn).ratio() for syn in synonyms)
+
+
+def is_complete(mapping: dict) -> bool:
+    """
+    A mapping is usable without the LLM once it has an identifier and a name.
+    """
+    has_id = bool(mapping.get("npi") or mapping.get("registration_number"))
+    has_name = bool(mapping.get("full_name") or (mapping.get("first_name") and mapping.get("last_name")))
+    return has_id and has_name
+
+
+class ColumnMapper:
+    """
+    Deterministic header -> schema mapping: synonym dictionary and fuzzy scoring, backed by a
+    persisted registry of mappings keyed by header-set fingerprint (learned from LLM-confirmed mappings).
+    """
+    def __init__(self, registry_path: str = None):
+        self.registry_path = registry_path or settings.COLUMN_MAP_REGISTRY_PATH
+        self._lock = threading.Lock()
+        self._registry = self._load()
+
+    def _load(self):
+        try:
+            with open(self.registry_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, fingerprint: str, entry: dict):
+        """
+        Adds one entry to the registry file. The file is re-read under an exclusive lock first,
+        so entries learned concurrently by other worker processes are kept.
+        """
+        directory = os.path.dirname(os.path.abspath(self.registry_path))
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{self.registry_path}.lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            registry = self._load()
+            registry[fingerprint] = entry
+            tmp_path = f"{self.registry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(registry, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.registry_path)
+        self._registry = registry
+
+    def lookup(self, columns):
+        """
+        Mapping previously learned for this exact header set, if any.
+        """
+        mapping = self._registry.get(header_fingerprint(columns))
+        if mapping and all(v is None or v in columns for v in mapping.values()):
+            return dict(mapping)
+        return None
+
+    def match(self, columns) -> dict:
+        """
+        Maps headers by synonym/fuzzy score; each input column is used for at most one field.
+        """
+        normalized = {c: normalize_header(c) for c in columns}
+        candidates = []
+        for field in TARGET_FIELDS:
+            for column, header in normalized.items():
+                score = score_header(header, field)
+                if score >= FUZZY_THRESHOLD:
+                    candidates.append((score, field, column))
+
+        mapping = {field: None for field in TARGET_FIELDS}
+        used = set()
+        for score, field, column in sorted(candidates, key=lambda c: -c[0]):
+            if mapping[field] is None and column not in used:
+                mapping[field] = column
+                used.add(column)
+        return mapping
+
+    def learn(self, columns, mapping: dict, confirmed=()) -> bool:
+        """
+        Persists a mapping for this header set, but only when every mapped field is an exact synonym
+        or in `confirmed` (agreed by the LLM): a wrong fuzzy guess would otherwise be replayed forever.
+        """
+        entry = {field: mapping.get(field) if mapping.get(field) in columns else None for field in TARGET_FIELDS}
+        for field, column in entry.items():
+            if column and field not in confirmed and score_header(normalize_header(column), field) < 1.0:
+                return False
+        fingerprint = header_fingerprint(columns)
+        with self._lock:
+            self._registry[fingerprint] = entry
+            try:
+                self._save(fingerprint, entry)
+            except OSError as e:
+                print(f"Warning: could not persist column mapping: {e}")
+        return True
+
+    def resolve(self, columns):
+        """
+        Returns (mapping, source) where source is "registry" or "rules",
+        or (partial_mapping, None) when the layout needs the LLM.
+        Rule-based mappings are not persisted: they are recomputed cheaply and stay in step with the rules.
+        """
+        columns = list(columns)
+        mapping = self.lookup(columns)
+        if mapping is not None:
+            return mapping, "registry"
+
+        mapping = self.match(columns)
+        if is_complete(mapping):
+            return mapping, "rules"
+        return mapping, None
+
+
+column_mapper = ColumnMapper()
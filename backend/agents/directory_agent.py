@@ -9,20 +9,27 @@ class DirectoryManagementAgent:
         """
         Generates a summary report of the validation process.
         """
-        valid_count = sum(1 for r in processed_records if r['validation_status'] == 'Valid')
-        flagged_count = sum(1 for r in processed_records if r['validation_status'] != 'Valid')
-        
         report = {
             "timestamp": datetime.now().isoformat(),
-            "total_processed": len(processed_records),
-            "valid_providers": valid_count,
-            "flagged_providers": flagged_count,
+            "total_processed": 0,
+            "valid_providers": 0,
+            "flagged_providers": 0,
+            "skipped_unchanged": 0,
             "accuracy_rate": metrics.get('accuracy', 0.0),
             "action_items": []
         }
         
-        # Prioritize actions
+        # Single pass so processed_records can be a list or a stream from the result store
         for record in processed_records:
+            report['total_processed'] += 1
+            if record['validation_status'] == 'Valid':
+                report['valid_providers'] += 1
+            else:
+                report['flagged_providers'] += 1
+            if record.get('reused'):
+                report['skipped_unchanged'] += 1
+
+            # Prioritize actions
             if record['confidence_score'] < 0.8:
                 report['action_items'].append({
                     "provider": f"{record['record'].get('first_name')} {record['record'].get('last_name')}",
@@ -0,0 +1,168 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from agents.llm_client import LLMClient, parse_json_response
+
+EXTRACT_FIELDS = ("npi", "first_name", "last_name", "website")
+
+
+def split_blocks(text: str):
+    """
+    Layout units of an OCR page: paragraphs (blank-line separated), with paragraphs longer than
+    a chunk broken at line boundaries by the caller.
+    """
+    return [block.strip("\n") for block in re.split(r"\n\s*\n", text) if block.strip()]
+
+
+def split_line(line: str, max_chars: int):
+    """
+    A line longer than a chunk (OCR often loses line breaks in tables) cut into pieces of at most
+    max_chars, at the last space where there is one.
+    """
+    pieces = []
+    while len(line) > max_chars:
+        cut = line.rfind(" ", 1, max_chars + 1)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(line[:cut])
+        line = line[cut:].lstrip(" ")
+    pieces.append(line)
+    return pieces
+
+
+def merge_fields(target: dict, record: dict):
+    for field, value in record.items():
+        if value and not target.get(field):
+            target[field] = value
+
+
+def record_name(record: dict):
+    return (str(record.get("first_name") or "").strip().lower(), str(record.get("last_name") or "").strip().lower())
+
+
+def chunk_text(pages, max_chars: int = None, overlap: int = None):
+    """
+    Splits OCR text into chunks of at most ~max_chars that end on paragraph or line boundaries
+    (lines longer than that are split first).
+    Each chunk starts with up to `overlap` chars of trailing lines from the previous one, so a
+    provider cut at a boundary is still seen whole by one of the chunks.
+    `pages` is a list of page texts (a plain string counts as one page); a page break always
+    closes a block.
+    """
+    max_chars = max_chars or settings.EXTRACT_CHUNK_CHARS
+    overlap = settings.EXTRACT_CHUNK_OVERLAP if overlap is None else overlap
+    if isinstance(pages, str):
+        pages = [pages]
+
+    lines = []  # line-level units with a marker for where a block starts
+    for page in pages:
+        for block in split_blocks(page or ""):
+            for i, line in enumerate(block.split("\n")):
+                for j, piece in enumerate(split_line(line, max_chars)):
+                    lines.append((piece, i == 0 and j == 0))
+
+    chunks = []
+    current = []
+    size = 0
+    for line, block_start in lines:
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            # carry whole trailing lines into the next chunk as overlap
+            carry = []
+            carried = 0
+            for prev in reversed(current):
+                if carried + len(prev) + 1 > min(overlap, max_chars - len(line) - 1):
+                    break
+                carry.insert(0, prev)
+                carried += len(prev) + 1
+            current, size = carry, carried
+        if block_start and current:
+            current.append("")
+            size += 1
+        current.append(line)
+        size += len(line) + 1
+    if current and any(l.strip() for l in current):
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def record_key(record: dict):
+    """
+    Dedup identity: NPI digits, an upper-cased registration number, else the lower-cased name.
+    """
+    npi = str(record.get("npi") or "").strip()
+    if npi:
+        digits = re.sub(r"\D", "", npi)
+        return ("id", digits if len(digits) == 10 and "/" not in npi else npi.upper().replace(" ", ""))
+    name = record_name(record)
+    return ("name", name) if any(name) else None
+
+
+def merge_records(record_lists):
+    """
+    Merges per-chunk results in document order; duplicates (overlap, repeated pages) are collapsed
+    and fill each other's missing fields.
+    """
+    merged = {}
+    for records in record_lists:
+        for record in records:
+            key = record_key(record)
+            if key is None:
+                continue
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(record)
+            else:
+                merge_fields(existing, record)
+
+    # A name-only record is folded into the record of the same provider found with an identifier
+    by_name = {}
+    for key, record in merged.items():
+        if key[0] == "id":
+            by_name.setdefault(record_name(record), record)
+    results = []
+    for key, record in merged.items():
+        if key[0] == "name" and key[1] in by_name:
+            merge_fields(by_name[key[1]], record)
+        else:
+            results.append(record)
+    return results
+
+
+class ExtractionAgent:
+    """
+    Structured provider extraction from OCR text: chunked, extracted concurrently, merged and
+    deduplicated, so latency is bounded by the slowest chunk instead of the document length.
+    """
+    def __init__(self, llm: LLMClient = None, concurrency: int = None):
+        self.llm = llm or LLMClient()
+        self.concurrency = concurrency or settings.EXTRACT_CONCURRENCY
+
+    def extract_chunk(self, text: str):
+        prompt = f"""
+        Extract provider information from this OCR text into a JSON list.
+        Fields: npi (string), first_name, last_name, website (optional).
+        Text:
+        {text}
+        """
+        response = self.llm.generate(prompt, system_prompt="Output JSON list of objects only.")
+        parsed = parse_json_response(response)
+        if isinstance(parsed, dict):
+            # some answers wrap the list ({"providers": [...]}) or return a single record
+            parsed = next((v for v in parsed.values() if isinstance(v, list)), [parsed])
+        if not isinstance(parsed, list):
+            return []
+        return [
+            {field: (str(r[field]).strip() if r.get(field) is not None else None) for field in EXTRACT_FIELDS}
+            for r in parsed if isinstance(r, dict)
+        ]
+
+    def extract(self, pages):
+        """
+        Provider records from OCR output (a list of page texts or one string).
+        """
+        chunks = chunk_text(pages)
+        if not chunks:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks))) as pool:
+            results = list(pool.map(self.extract_chunk, chunks))
+        return merge_records(results)
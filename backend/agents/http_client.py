@@ -0,0 +1,126 @@
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import settings
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of making a request while a host's circuit breaker is open.
+    """
+
+
+class CappedRetry(Retry):
+    """
+    Exponential backoff that honors Retry-After, but never sleeps longer than `max_retry_after`.
+    """
+    max_retry_after = 30
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: opens after `failure_threshold` consecutive failures, fails fast for
+    `reset_timeout` seconds, then lets one trial request through (half-open) before closing again.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts = {}  # host -> {"failures": int, "opened_at": float | None, "trial": bool}
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state or state["opened_at"] is None:
+                return True
+            if time.monotonic() - state["opened_at"] < self.reset_timeout or state["trial"]:
+                return False
+            state["trial"] = True  # half-open: a single probe request
+            return True
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host: str):
+        with self._lock:
+            state = self._hosts.setdefault(host, {"failures": 0, "opened_at": None, "trial": False})
+            state["failures"] += 1
+            if state["trial"] or state["failures"] >= self.failure_threshold:
+                state["opened_at"] = time.monotonic()
+                state["trial"] = False
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state or state["opened_at"] is None:
+                return "closed"
+            if time.monotonic() - state["opened_at"] < self.reset_timeout:
+                return "open"
+            return "half-open"
+
+    def snapshot(self):
+        with self._lock:
+            hosts = list(self._hosts)
+        return {host: self.state(host) for host in hosts}
+
+
+class HTTPClient:
+    """
+    Keep-alive session (one for registry calls, one for website checks): pooled connections with a per-host
+    limit, retries with exponential backoff on 429/5xx, and a circuit breaker per host.
+    """
+    def __init__(self, pool_per_host: int = None, retries: int = None, backoff: float = None,
+                 failure_threshold: int = None, reset_timeout: float = None):
+        pool_per_host = pool_per_host or settings.HTTP_POOL_PER_HOST
+        retry = CappedRetry(
+            total=settings.HTTP_RETRIES if retries is None else retries,
+            backoff_factor=settings.HTTP_BACKOFF if backoff is None else backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # pool_block caps concurrent connections per host at pool_per_host
+        adapter = HTTPAdapter(pool_connections=settings.HTTP_POOL_HOSTS, pool_maxsize=pool_per_host,
+                              max_retries=retry, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(
+            settings.CIRCUIT_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold,
+            settings.CIRCUIT_RESET_TIMEOUT if reset_timeout is None else reset_timeout,
+        )
+
+    def request(self, method: str, url: str, **kwargs):
+        host = urlparse(url).netloc
+        if not self.breaker.allow(host):
+            raise CircuitOpenError(f"Circuit open for {host}")
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            self.breaker.record_failure(host)
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure(host)
+        else:
+            self.breaker.record_success(host)
+        return response
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+
+http_client = HTTPClient()
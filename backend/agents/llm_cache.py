@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import settings
+from metrics import metrics, label_string
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def cache_key(model: str, system_prompt: str, prompt: str, options: dict = None):
+    """
+    Content address of a generation request.
+    """
+    material = json.dumps(
+        {"model": model, "system": system_prompt or "", "prompt": prompt, "options": options or {}},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class DiskLLMCache:
+    """
+    SQLite-file cache with least-recently-used eviction once max_entries or max_bytes is exceeded.
+    """
+    def __init__(self, path: str, max_entries: int, max_bytes: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            return row[0] if row else None
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), time.time())
+            )
+            self._writes += 1
+            # Checking the totals costs a table scan, so only do it periodically
+            if self._writes % 50 == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            excess = max(count - self.max_entries, 1)
+            rows = self._conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY accessed_at LIMIT ?", (excess,)
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(k,) for k, _ in rows])
+            count -= len(rows)
+            total -= sum(size for _, size in rows)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class RedisLLMCache:
+    """
+    Redis cache shared by all workers; a sorted set of access times drives LRU eviction past max_entries.
+    """
+    def __init__(self, redis_url: str, max_entries: int, ttl: int):
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=1, decode_responses=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = "llm_cache:"
+        self.index_key = "llm_cache:index"
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        if value is not None:
+            self.client.zadd(self.index_key, {key: time.time()})
+        return value
+
+    def set(self, key: str, value: str):
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value, ex=self.ttl or None)
+        pipe.zadd(self.index_key, {key: time.time()})
+        pipe.zcard(self.index_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            stale = self.client.zrange(self.index_key, 0, size - self.max_entries - 1)
+            if stale:
+                pipe = self.client.pipeline()
+                pipe.delete(*[self.prefix + k for k in stale])
+                pipe.zrem(self.index_key, *stale)
+                pipe.execute()
+
+    def __len__(self):
+        return self.client.zcard(self.index_key)
+
+
+class LLMCache:
+    """
+    Front for the configured LLM response cache backend ("disk", "redis" or "off").
+    Cache failures never break generation; they count as misses. Hits and misses are also
+    counted in the shared agenciai_cache_requests_total metric, so stats() covers all workers.
+    """
+    def __init__(self, backend: str = None):
+        self.backend_name = (backend or settings.LLM_CACHE_BACKEND).lower()
+        self._backend = None
+        self._init_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.backend_name in ("disk", "redis")
+
+    def _get_backend(self):
+        if self._backend is None and self.enabled:
+            with self._init_lock:
+                if self._backend is None:
+                    try:
+                        if self.backend_name == "redis" and redis:
+                            self._backend = RedisLLMCache(
+                                settings.REDIS_URL, settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL
+                            )
+                        else:
+                            self._backend = DiskLLMCache(
+                                settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_MAX_BYTES
+                            )
+                    except Exception as e:
+                        print(f"Warning: LLM cache disabled ({e})")
+                        self.backend_name = "off"
+        return self._backend
+
+    def get(self, key: str):
+        backend = self._get_backend()
+        value = None
+        if backend is not None:
+            try:
+                value = backend.get(key)
+            except Exception as e:
+                print(f"Warning: LLM cache read failed: {e}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        metrics.inc("agenciai_cache_requests_total", cache="llm", result="hit" if value is not None else "miss")
+        return value
+
+    def set(self, key: str, value: str):
+        backend = self._get_backend()
+        if backend is not None:
+            try:
+                backend.set(key, value)
+            except Exception as e:
+                print(f"Warning: LLM cache write failed: {e}")
+
+    def stats(self):
+        backend = self._get_backend()
+        entries = None
+        if backend is not None:
+            try:
+                entries = len(backend)
+            except Exception:
+                pass
+        stats = {"backend": self.backend_name, "entries": entries, "process": {"hits": self.hits, "misses": self.misses}}
+
+        counts = metrics.counter("agenciai_cache_requests_total")
+        hits = int(counts.get(label_string({"cache": "llm", "result": "hit"}), 0)) if counts else self.hits
+        misses = int(counts.get(label_string({"cache": "llm", "result": "miss"}), 0)) if counts else self.misses
+        stats.update(hits=hits, misses=misses, hit_rate=round(hits / (hits + misses), 4) if hits + misses else 0.0)
+        return stats
+
+
+llm_cache = LLMCache()
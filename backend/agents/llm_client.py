@@ -1,48 +1,157 @@
 import requests
 import json
+import time
 from config import settings
+from agents.llm_cache import LLMCache, cache_key, llm_cache
+from agents.llm_metrics import LLMMetrics, call_metrics, llm_metrics
+from metrics import metrics as pipeline_metrics
+from agents.column_mapper import TARGET_FIELDS, column_mapper, is_complete
+
+def parse_json_response(response: str):
+    """
+    Parses JSON out of an LLM answer (strips markdown fences). Returns None if it is not valid JSON.
+    """
+    try:
+        clean_json = response.strip().replace("```json", "").replace("```", "")
+        return json.loads(clean_json)
+    except Exception:
+        return None
 
 class LLMClient:
-    def __init__(self):
+    def __init__(self, cache: LLMCache = None, metrics: LLMMetrics = None):
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = "llama3"
+        self.cache = cache or llm_cache
+        self.metrics = metrics or llm_metrics
 
-    def generate(self, prompt: str, system_prompt: str = ""):
-        """
-        Generate text using local Llama 3 via Ollama.
-        """
-        url = f"{self.base_url}/api/generate"
-        
+    def _payload(self, prompt: str, system_prompt: str, options: dict, stream: bool):
         payload = {
             "model": self.model,
             "prompt": prompt,
             "system": system_prompt,
-            "stream": False
+            "stream": stream
         }
+        if options:
+            payload["options"] = options
+        return payload
+
+    def generate(self, prompt: str, system_prompt: str = "", options: dict = None, use_cache: bool = True):
+        """
+        Generate text using local Llama 3 via Ollama.
+        Answers are cached by (model, system prompt, prompt, options); pass use_cache=False to force a fresh call.
+        """
+        url = f"{self.base_url}/api/generate"
         
+        key = cache_key(self.model, system_prompt, prompt, options) if use_cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            response = requests.post(url, json=payload, timeout=60)
+            started = time.perf_counter()
+            response = requests.post(url, json=self._payload(prompt, system_prompt, options, False), timeout=60)
             response.raise_for_status()
-            return response.json().get("response", "")
+            body = response.json()
+            text = body.get("response", "")
         except Exception as e:
             print(f"Error calling Ollama: {e}")
+            pipeline_metrics.inc("agenciai_errors_total", stage="llm", reason=type(e).__name__)
             return f"Error: Could not connect to AI Brain at {self.base_url}"
 
+        self.metrics.record(call_metrics(body, started))
+        if key:
+            self.cache.set(key, text)
+        return text
+
+    def generate_stream(self, prompt: str, system_prompt: str = "", options: dict = None, use_cache: bool = True):
+        """
+        Like generate(), but yields the answer as Ollama produces it (NDJSON stream).
+        Cached answers are yielded in one piece; completed answers are cached as usual.
+        """
+        url = f"{self.base_url}/api/generate"
+
+        key = cache_key(self.model, system_prompt, prompt, options) if use_cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        first_token_at = None
+        final = None
+        started = time.perf_counter()
+        try:
+            # the read timeout applies between lines, not to the whole answer
+            with requests.post(url, json=self._payload(prompt, system_prompt, options, True), stream=True, timeout=60) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    token = chunk.get("response", "")
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        parts.append(token)
+                        yield token
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+        except Exception as e:
+            print(f"Error calling Ollama: {e}")
+            pipeline_metrics.inc("agenciai_errors_total", stage="llm", reason=type(e).__name__)
+            if not parts:
+                yield f"Error: Could not connect to AI Brain at {self.base_url}"
+            return
+
+        if final is not None:
+            self.metrics.record(call_metrics(final, started, first_token_at, stream=True))
+            if key:
+                self.cache.set(key, "".join(parts))
+
+    def warm_up(self):
+        """
+        Asks Ollama to load the model (a generate call without a prompt) so the first task doesn't pay for it.
+        """
+        response = requests.post(f"{self.base_url}/api/generate", json={"model": self.model}, timeout=300)
+        response.raise_for_status()
+
     def map_csv_columns(self, columns: list):
         """
         Intelligently map broad range of CSV headers to our standardized schema.
+        Known layouts are resolved locally by the column mapper; only unknown layouts reach the LLM.
         """
+        mapping, source = column_mapper.resolve(columns)
+        if source:
+            return mapping
+
         prompt = f"""
-        Map these CSV columns to the target fields: 'npi', 'first_name', 'last_name'.
+        Map these CSV columns to the target fields: {TARGET_FIELDS}.
         Return JSON only. keys = target fields, values = input columns.
         If no match found, use null.
         
         Input Columns: {columns}
         """
         response = self.generate(prompt, system_prompt="You are a data mapping assistant. Output valid JSON only.")
-        try:
-            # Simple cleanup for JSON parsing
-            clean_json = response.strip().replace("```json", "").replace("```", "")
-            return json.loads(clean_json)
-        except:
-            return {}
+        llm_map = parse_json_response(response)
+        if not isinstance(llm_map, dict):
+            return mapping
+
+        # Deterministic matches win; the LLM fills the gaps
+        confirmed = set()
+        for field, value in llm_map.items():
+            if isinstance(value, list) and value:
+                value = value[0]
+            if not isinstance(value, str) or value not in columns:
+                continue
+            if not mapping.get(field):
+                mapping[field] = value
+            if mapping.get(field) == value:
+                confirmed.add(field)
+        if is_complete(mapping):
+            column_mapper.learn(columns, mapping, confirmed)
+        return mapping
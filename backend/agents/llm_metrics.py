@@ -0,0 +1,122 @@
+import json
+import time
+from config import settings
+from metrics import metrics as pipeline_metrics
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Summed per call type; averages are derived from these in stats()
+SUM_FIELDS = ("seconds", "ttft", "prompt_tokens", "eval_tokens", "eval_seconds", "prompt_eval_seconds")
+
+
+def call_metrics(chunk: dict, started: float, first_token_at: float = None, stream: bool = False):
+    """
+    Per-call metrics from Ollama's final response object (durations are in nanoseconds).
+    Without a client-side first-token time, TTFT is estimated as model load + prompt evaluation.
+    """
+    now = time.perf_counter()
+    eval_seconds = chunk.get("eval_duration", 0) / 1e9
+    prompt_eval_seconds = chunk.get("prompt_eval_duration", 0) / 1e9
+    eval_tokens = chunk.get("eval_count", 0)
+    if first_token_at is not None:
+        ttft = first_token_at - started
+    else:
+        ttft = chunk.get("load_duration", 0) / 1e9 + prompt_eval_seconds
+    return {
+        "stream": stream,
+        "seconds": round(now - started, 4),
+        "ttft": round(ttft, 4),
+        "prompt_tokens": chunk.get("prompt_eval_count", 0),
+        "eval_tokens": eval_tokens,
+        "eval_seconds": round(eval_seconds, 4),
+        "prompt_eval_seconds": round(prompt_eval_seconds, 4),
+        "tokens_per_sec": round(eval_tokens / eval_seconds, 2) if eval_seconds else 0.0,
+    }
+
+
+def percentile(values, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class LLMMetrics:
+    """
+    Shared LLM call metrics in Redis: running sums per call type for averages, plus a capped
+    list of recent calls for percentiles and dashboards.
+    """
+    def __init__(self, redis_url: str = None, recent: int = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.recent = recent or settings.LLM_METRICS_RECENT
+        self.sums_key = "llm:metrics"
+        self.recent_key = "llm:metrics:recent"
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None and redis:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=1, decode_responses=True)
+        return self._redis
+
+    def record(self, metrics: dict):
+        kind = "stream" if metrics.get("stream") else "generate"
+        pipeline_metrics.observe("agenciai_llm_request_seconds", metrics["seconds"], mode=kind)
+        pipeline_metrics.inc("agenciai_llm_tokens_total", metrics.get("prompt_tokens", 0), type="prompt")
+        pipeline_metrics.inc("agenciai_llm_tokens_total", metrics.get("eval_tokens", 0), type="eval")
+        try:
+            client = self._client()
+            if not client:
+                return
+            pipe = client.pipeline()
+            pipe.hincrby(self.sums_key, f"{kind}:calls", 1)
+            for field in SUM_FIELDS:
+                pipe.hincrbyfloat(self.sums_key, f"{kind}:{field}", metrics.get(field) or 0)
+            pipe.lpush(self.recent_key, json.dumps({**metrics, "at": time.time()}))
+            pipe.ltrim(self.recent_key, 0, self.recent - 1)
+            pipe.execute()
+        except Exception as e:
+            print(f"Warning: could not record LLM metrics: {e}")
+
+    def stats(self):
+        sums, recent = {}, []
+        try:
+            client = self._client()
+            if client:
+                sums = client.hgetall(self.sums_key)
+                recent = [json.loads(r) for r in client.lrange(self.recent_key, 0, -1)]
+        except Exception as e:
+            print(f"Warning: could not read LLM metrics: {e}")
+
+        totals = {}
+        for kind in ("generate", "stream"):
+            calls = int(sums.get(f"{kind}:calls", 0))
+            if not calls:
+                continue
+            values = {field: float(sums.get(f"{kind}:{field}", 0)) for field in SUM_FIELDS}
+            totals[kind] = {
+                "calls": calls,
+                "prompt_tokens": int(values["prompt_tokens"]),
+                "eval_tokens": int(values["eval_tokens"]),
+                "avg_seconds": round(values["seconds"] / calls, 4),
+                "avg_ttft": round(values["ttft"] / calls, 4),
+                "tokens_per_sec": round(values["eval_tokens"] / values["eval_seconds"], 2) if values["eval_seconds"] else 0.0,
+            }
+
+        ttfts = [r["ttft"] for r in recent]
+        rates = [r["tokens_per_sec"] for r in recent if r.get("tokens_per_sec")]
+        return {
+            "totals": totals,
+            "recent": {
+                "calls": len(recent),
+                "ttft_p50": percentile(ttfts, 50),
+                "ttft_p95": percentile(ttfts, 95),
+                "tokens_per_sec_p50": percentile(rates, 50),
+                "last": recent[:10],
+            },
+        }
+
+
+llm_metrics = LLMMetrics()
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# Indian Medical Registration Number: 2-4 letter council code / 4-6 digits (e.g. TNMC/12345)
+INDIAN_REG_PATTERN = r"^[A-Za-z]{2,4}/[0-9]{4,6}$"
+
+MISSING_VALUES = ("", "nan", "NaN", "None", "none", "null", "NULL")
+
+# Float artefact pandas leaves on numeric IDs ("1234567890.0")
+FLOAT_SUFFIX = r"\.0$"
+
+
+def find_column(columns, mapped: str, keywords):
+    """
+    Resolves a source column once per file: the mapped column, else the first header containing a keyword.
+    """
+    if mapped and mapped in columns:
+        return mapped
+    for column in columns:
+        if any(k in str(column).lower() for k in keywords):
+            return column
+    return None
+
+
+def clean_text(series: pd.Series) -> pd.Series:
+    """
+    Strings with surrounding whitespace removed and missing markers turned into "".
+    """
+    values = series.astype("string").fillna("").str.strip()
+    return values.mask(values.isin(MISSING_VALUES), "")
+
+
+def clean_ids(series: pd.Series) -> pd.Series:
+    """
+    NPI/registration cleanup: float artefacts ("1234567890.0") stripped and
+    Indian registration numbers upper-cased so "tnmc/12345" validates like "TNMC/12345".
+    """
+    ids = clean_text(series).str.replace(FLOAT_SUFFIX, "", regex=True)
+    is_registration = ids.str.match(INDIAN_REG_PATTERN)
+    return ids.mask(is_registration, ids.str.upper())
+
+
+def normalize_frame(df: pd.DataFrame, col_map: dict) -> pd.DataFrame:
+    """
+    Column-at-a-time version of the record normalization: NPI cleanup with registration-number
+    fallback and "Dr. First Last" splitting, with column resolution done once per frame.
+    Returns a frame with the standard npi, first_name, last_name, website columns.
+    """
+    columns = list(df.columns)
+    empty = pd.Series("", index=df.index, dtype="string")
+
+    def column(name):
+        return clean_text(df[name]) if name else empty
+
+    npi_col = col_map.get('npi') if col_map.get('npi') in columns else None
+    reg_col = find_column(columns, col_map.get('registration_number'), ('registration', 'reg_no'))
+    npi = clean_ids(df[npi_col]) if npi_col else empty
+    if reg_col and reg_col != npi_col:
+        npi = npi.mask(npi == "", clean_ids(df[reg_col]))
+
+    first_col = col_map.get('first_name') if col_map.get('first_name') in columns else None
+    last_col = col_map.get('last_name') if col_map.get('last_name') in columns else None
+    first_name = column(first_col)
+    last_name = column(last_col)
+
+    # Full Name -> First/Last where neither part is present
+    full_col = find_column(columns, col_map.get('full_name'), ('full_name', 'provider_name'))
+    if full_col:
+        needs_split = (first_name == "") & (last_name == "")
+        parts = column(full_col).str.replace("Dr.", "", regex=False).str.strip().str.partition(" ")
+        first_name = first_name.mask(needs_split, parts[0])
+        last_name = last_name.mask(needs_split, parts[2])
+
+    website_col = col_map.get('website') if col_map.get('website') in columns else None
+    website = column(website_col)
+
+    return pd.DataFrame({
+        "npi": npi.astype(object),
+        "first_name": first_name.astype(object),
+        "last_name": last_name.astype(object),
+        "website": website.astype(object).where(website != "", None),
+    })
+
+
+def normalize_records(df: pd.DataFrame, col_map: dict):
+    """
+    Normalized records for the validation stage.
+    Built from column lists, which is much cheaper than DataFrame.to_dict's per-value boxing.
+    """
+    frame = normalize_frame(df, col_map)
+    fields = list(frame.columns)
+    return [dict(zip(fields, row)) for row in zip(*(frame[f].tolist() for f in fields))]
+
+
+def npi_check_digit(first9: str) -> str:
+    """
+    CMS NPI check digit: Luhn over the first 9 digits prefixed with 80840
+    (the prefix contributes a constant 24 to the Luhn sum).
+    """
+    total = 24
+    for i, ch in enumerate(reversed(first9)):
+        d = int(ch)
+        if i % 2 == 0:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return str((10 - total % 10) % 10)
+
+
+def npi_structure_reasons(npis) -> pd.Series:
+    """
+    Vectorized NPI structure check (10 digits + CMS Luhn check digit with the 80840 prefix).
+    Returns the rejection reason per value ("" for well-formed NPIs and for values that are not
+    NPI-like: empty, or registration numbers containing a slash or letters). Reasons match
+    validation_agent.npi_structure_error.
+    """
+    ids = clean_text(pd.Series(npis, dtype="string"))
+    reasons = pd.Series("", index=ids.index, dtype=object)
+
+    npi_like = (ids != "") & ~ids.str.contains(r"[/A-Za-z]", regex=True)
+    all_digits = ids.str.fullmatch(r"\d+").fillna(False)
+    lengths = ids.str.len()
+
+    reasons[npi_like & ~all_digits] = "NPI must contain only digits"
+    wrong_length = npi_like & all_digits & (lengths != 10)
+    reasons[wrong_length] = "NPI must be 10 digits (got " + lengths[wrong_length].astype(str) + ")"
+
+    candidates = npi_like & all_digits & (lengths == 10)
+    if candidates.any():
+        values = ids[candidates].to_numpy(dtype="U10")
+        digits = values.astype("S10").view(np.uint8).reshape(-1, 10).astype(np.int64) - ord("0")
+        doubled = digits[:, 0:9:2] * 2
+        doubled -= 9 * (doubled > 9)
+        total = 24 + doubled.sum(axis=1) + digits[:, 1:9:2].sum(axis=1)
+        expected = (10 - total % 10) % 10
+        actual = digits[:, 9]
+        bad = expected != actual
+        if bad.any():
+            bad_index = ids[candidates].index[bad]
+            reasons[bad_index] = [
+                f"NPI check digit mismatch (expected {e}, got {a})" for e, a in zip(expected[bad], actual[bad])
+            ]
+    return reasons
@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from config import settings
+from metrics import metrics, label_string
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Stored in place of a provider payload for "NPI not found in registry" lookups
+NOT_FOUND = "__not_found__"
+
+# Seconds before reconnecting after Redis failed; doubles on every failure up to the maximum
+REDIS_RETRY_MIN = 5.0
+REDIS_RETRY_MAX = 300.0
+
+
+class NPICache:
+    """
+    Two-level cache for NPI registry lookups: an in-process LRU in front of a shared Redis store.
+    Values are the raw registry provider payloads, so name matching still runs per record.
+    Shared hit/miss counters live in the agenciai_cache_requests_total metric.
+    """
+    def __init__(self, redis_url: str = None, ttl: int = None, negative_ttl: int = None, max_local: int = None):
+        self.redis_url = redis_url or settings.NPI_CACHE_REDIS_URL
+        self.ttl = ttl if ttl is not None else settings.NPI_CACHE_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.NPI_CACHE_NEGATIVE_TTL
+        self.max_local = max_local if max_local is not None else settings.NPI_CACHE_LOCAL_SIZE
+        self.prefix = "npi_cache:"
+
+        self._local = OrderedDict()  # npi -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._redis = None
+        self._retry_at = 0.0
+        self._retry_delay = REDIS_RETRY_MIN
+        self._counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0}
+
+    def _client(self):
+        if self._redis is None and redis and self.redis_url and time.monotonic() >= self._retry_at:
+            try:
+                self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+                self._redis.ping()
+                self._retry_delay = REDIS_RETRY_MIN
+            except Exception as e:
+                self._redis_down(e)
+        return self._redis
+
+    def _redis_down(self, error):
+        """
+        Drops the connection and backs off, so lookups don't each wait for a Redis timeout.
+        """
+        print(f"Warning: NPI cache running without Redis for {self._retry_delay:.0f}s ({error})")
+        self._redis = None
+        self._retry_at = time.monotonic() + self._retry_delay
+        self._retry_delay = min(self._retry_delay * 2, REDIS_RETRY_MAX)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+        metrics.inc("agenciai_cache_requests_total", cache="npi", result=name)
+
+    def _set_local(self, npi, value, ttl):
+        with self._lock:
+            self._local[npi] = (time.time() + ttl, value)
+            self._local.move_to_end(npi)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+    def get(self, npi: str):
+        """
+        Returns (hit, provider). provider is None for a cached "not found" result.
+        """
+        with self._lock:
+            entry = self._local.get(npi)
+            if entry and entry[0] > time.time():
+                self._local.move_to_end(npi)
+                value = entry[1]
+            else:
+                value = None
+                if entry:
+                    del self._local[npi]
+
+        if value is not None:
+            self._count("local_hits")
+            return True, None if value == NOT_FOUND else value
+
+        client = self._client()
+        if client:
+            try:
+                raw = client.get(self.prefix + npi)
+                if raw is not None:
+                    value = json.loads(raw)
+                    ttl = client.ttl(self.prefix + npi)
+                    self._set_local(npi, value, ttl if ttl and ttl > 0 else self.negative_ttl)
+                    self._count("redis_hits")
+                    return True, None if value == NOT_FOUND else value
+            except Exception as e:
+                self._redis_down(f"read failed: {e}")
+
+        self._count("misses")
+        return False, None
+
+    def set(self, npi: str, provider):
+        """
+        Caches a registry payload, or a negative result when provider is None.
+        """
+        value = NOT_FOUND if provider is None else provider
+        ttl = self.negative_ttl if provider is None else self.ttl
+        if ttl <= 0:
+            return
+        self._set_local(npi, value, ttl)
+
+        client = self._client()
+        if client:
+            try:
+                client.set(self.prefix + npi, json.dumps(value), ex=ttl)
+            except Exception as e:
+                self._redis_down(f"write failed: {e}")
+        self._count("stores")
+
+    def stats(self):
+        """
+        Hit/miss counters for this process and, when Redis is available, across all workers.
+        """
+        with self._lock:
+            local = dict(self._counters)
+        stats = {
+            "process": local,
+            "local_entries": len(self._local),
+            "registry_calls_saved": local["local_hits"] + local["redis_hits"],
+        }
+
+        counts = metrics.counter("agenciai_cache_requests_total")
+        if counts:
+            shared = {k: int(counts.get(label_string({"cache": "npi", "result": k}), 0)) for k in local}
+            stats["shared"] = shared
+            lookups = shared["local_hits"] + shared["redis_hits"] + shared["misses"]
+            hits = shared["local_hits"] + shared["redis_hits"]
+            stats["registry_calls_saved"] = hits
+            stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+
+npi_cache = NPICache()
@@ -0,0 +1,199 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+from config import settings
+
+# NPPES dissemination file columns used by the index
+NPPES_NPI = "NPI"
+NPPES_ENTITY_TYPE = "Entity Type Code"
+NPPES_ORG_NAME = "Provider Organization Name (Legal Business Name)"
+NPPES_LAST_NAME = "Provider Last Name (Legal Name)"
+NPPES_FIRST_NAME = "Provider First Name"
+NPPES_LAST_UPDATE = "Last Update Date"
+NPPES_DEACTIVATION = "NPI Deactivation Date"
+NPPES_REACTIVATION = "NPI Reactivation Date"
+NPPES_TAXONOMY_SLOTS = 15
+
+
+def _nppes_date(series: pd.Series) -> pd.Series:
+    """
+    NPPES MM/DD/YYYY dates -> registry API style YYYY-MM-DD ("" when missing).
+    """
+    parsed = pd.to_datetime(series, format="%m/%d/%Y", errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d").fillna("")
+
+
+def _primary_taxonomy(chunk: pd.DataFrame) -> pd.Series:
+    """
+    First taxonomy slot flagged as primary ("Y"), falling back to slot 1.
+    """
+    primary = pd.Series("", index=chunk.index, dtype=object)
+    for slot in range(NPPES_TAXONOMY_SLOTS, 0, -1):
+        code_col = f"Healthcare Provider Taxonomy Code_{slot}"
+        switch_col = f"Healthcare Provider Primary Taxonomy Switch_{slot}"
+        if code_col in chunk and switch_col in chunk:
+            primary = primary.mask(chunk[switch_col] == "Y", chunk[code_col])
+    if "Healthcare Provider Taxonomy Code_1" in chunk:
+        primary = primary.mask(primary == "", chunk["Healthcare Provider Taxonomy Code_1"])
+    return primary
+
+
+def load_taxonomy_names(path: str):
+    """
+    Optional NUCC taxonomy CSV (Code, Classification/Display Name) so the index can store descriptions.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    name_col = next((c for c in ("Display Name", "Classification") if c in df.columns), None)
+    if "Code" not in df.columns or not name_col:
+        raise ValueError("Taxonomy file needs 'Code' and 'Display Name' or 'Classification' columns")
+    return dict(zip(df["Code"], df[name_col]))
+
+
+class NPIIndex:
+    """
+    Local NPI lookup table built from an NPPES-format CSV (SQLite, NPI as the integer primary key).
+    lookup() returns payloads shaped like the registry API result so validation logic is shared.
+    """
+    def __init__(self, path: str = None, max_age_days: int = None):
+        self.path = path or settings.NPI_INDEX_PATH
+        self.max_age_days = max_age_days if max_age_days is not None else settings.NPI_INDEX_MAX_AGE_DAYS
+        self._local = threading.local()
+
+    @property
+    def available(self):
+        return os.path.exists(self.path)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, npi: str):
+        """
+        Returns (provider, fresh). provider is None when the NPI is not in the index;
+        fresh is False when the entry is older than NPI_INDEX_MAX_AGE_DAYS.
+        """
+        if not self.available or not str(npi).isdigit():
+            return None, False
+        row = self._conn().execute(
+            "SELECT first_name, last_name, organization_name, status, last_updated, taxonomy_code, taxonomy_desc, imported_at "
+            "FROM providers WHERE npi = ?", (int(npi),)
+        ).fetchone()
+        if not row:
+            return None, False
+
+        first_name, last_name, org_name, status, last_updated, tax_code, tax_desc, imported_at = row
+        fresh = not self.max_age_days or (time.time() - imported_at) <= self.max_age_days * 86400
+        provider = {
+            "number": npi,
+            "basic": {
+                "first_name": first_name or "",
+                "last_name": last_name or "",
+                "organization_name": org_name or "",
+                "status": status,
+                "last_updated": last_updated,
+            },
+            "taxonomies": [{"code": tax_code, "desc": tax_desc or tax_code, "primary": True}] if tax_code else [],
+            "source": "nppes_index",
+        }
+        return provider, fresh
+
+    def stats(self):
+        if not self.available:
+            return {"available": False}
+        conn = self._conn()
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        count = conn.execute("SELECT COUNT(*) FROM providers").fetchone()[0]
+        return {"available": True, "providers": count, **meta}
+
+
+def build_index(csv_path: str, db_path: str = None, taxonomy_path: str = None, chunksize: int = 100000):
+    """
+    Imports (or refreshes) the index from an NPPES dissemination CSV, streaming it in chunks.
+    Existing NPIs are replaced, so weekly incremental files can be applied on top of a full import.
+    """
+    db_path = db_path or settings.NPI_INDEX_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    taxonomy_names = load_taxonomy_names(taxonomy_path) if taxonomy_path else {}
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS providers ("
+        "npi INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, organization_name TEXT, status TEXT, "
+        "last_updated TEXT, taxonomy_code TEXT, taxonomy_desc TEXT, imported_at REAL) WITHOUT ROWID"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    taxonomy_cols = [
+        c for slot in range(1, NPPES_TAXONOMY_SLOTS + 1)
+        for c in (f"Healthcare Provider Taxonomy Code_{slot}", f"Healthcare Provider Primary Taxonomy Switch_{slot}")
+        if c in header
+    ]
+    wanted = [NPPES_NPI, NPPES_ENTITY_TYPE, NPPES_ORG_NAME, NPPES_LAST_NAME, NPPES_FIRST_NAME,
+              NPPES_LAST_UPDATE, NPPES_DEACTIVATION, NPPES_REACTIVATION] + taxonomy_cols
+    usecols = [c for c in wanted if c in header]
+
+    imported = 0
+    now = time.time()
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=str, keep_default_na=False, chunksize=chunksize):
+        chunk = chunk[chunk[NPPES_NPI].str.fullmatch(r"\d{10}")]
+        if chunk.empty:
+            continue
+
+        def col(name):
+            return chunk[name] if name in chunk else pd.Series("", index=chunk.index, dtype=object)
+
+        deactivated = _nppes_date(col(NPPES_DEACTIVATION))
+        reactivated = _nppes_date(col(NPPES_REACTIVATION))
+        # Deactivated unless a later reactivation exists
+        status = pd.Series("A", index=chunk.index).mask((deactivated != "") & (reactivated < deactivated), "D")
+        taxonomy = _primary_taxonomy(chunk)
+
+        rows = zip(
+            chunk[NPPES_NPI].astype("int64").tolist(),
+            col(NPPES_FIRST_NAME).tolist(),
+            col(NPPES_LAST_NAME).tolist(),
+            col(NPPES_ORG_NAME).tolist(),
+            status.tolist(),
+            _nppes_date(col(NPPES_LAST_UPDATE)).tolist(),
+            taxonomy.tolist(),
+            taxonomy.map(lambda code: taxonomy_names.get(code, "")).tolist(),
+            [now] * len(chunk),
+        )
+        conn.executemany("INSERT OR REPLACE INTO providers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        imported += len(chunk)
+
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+        ("built_at", datetime.now().isoformat()),
+        ("source", os.path.basename(csv_path)),
+    ])
+    conn.commit()
+    conn.close()
+    return imported
+
+
+npi_index = NPIIndex()
+
+
+if __name__ == "__main__":
+    # Usage (from backend/): python -m agents.npi_index npidata_pfile.csv [--taxonomy nucc_taxonomy.csv]
+    parser = argparse.ArgumentParser(description="Build the local NPI index from an NPPES dissemination CSV.")
+    parser.add_argument("csv_path")
+    parser.add_argument("--db", default=None, help="Index path (defaults to NPI_INDEX_PATH)")
+    parser.add_argument("--taxonomy", default=None, help="NUCC taxonomy CSV for taxonomy descriptions")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+
+    started = time.time()
+    count = build_index(args.csv_path, args.db, args.taxonomy, args.chunksize)
+    print(f"Indexed {count} providers in {time.time() - started:.1f}s")
@@ -1,28 +1,208 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from config import settings
+from metrics import metrics
+
 try:
     from paddleocr import PaddleOCR
 except ImportError:
     PaddleOCR = None
 
+# PDF rasterizers: PyMuPDF needs no system packages, pdf2image needs poppler
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+except ImportError:
+    convert_from_path = pdfinfo_from_path = None
+
+# Warm model for the current process (pool worker or, in serial mode, the caller)
+_worker_ocr = None
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def is_pdf(path: str) -> bool:
+    return str(path).lower().endswith(".pdf")
+
+
+def page_count(path: str) -> int:
+    """
+    Number of pages to OCR; images count as a single page.
+    """
+    if not is_pdf(path):
+        return 1
+    if fitz:
+        with fitz.open(path) as doc:
+            return doc.page_count
+    if pdfinfo_from_path:
+        return int(pdfinfo_from_path(path)["Pages"])
+    raise RuntimeError("PDF rasterization needs PyMuPDF or pdf2image")
+
+
+def rasterize_page(path: str, page_no: int, dpi: int):
+    """
+    Renders one PDF page (0-based) to a BGR uint8 array, the layout PaddleOCR expects.
+    """
+    if fitz:
+        with fitz.open(path) as doc:
+            pix = doc.load_page(page_no).get_pixmap(dpi=dpi, alpha=False)
+            image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    elif convert_from_path:
+        page = convert_from_path(path, dpi=dpi, first_page=page_no + 1, last_page=page_no + 1)[0]
+        image = np.asarray(page.convert("RGB"))
+    else:
+        raise RuntimeError("PDF rasterization needs PyMuPDF or pdf2image")
+    return np.ascontiguousarray(image[:, :, ::-1])
+
+
+def _create_ocr(cpu_threads: int = None):
+    kwargs = {"use_angle_cls": True, "lang": "en", "show_log": False}
+    if cpu_threads:
+        kwargs["cpu_threads"] = cpu_threads
+    return PaddleOCR(**kwargs)
+
+
+def _init_worker(cpu_threads: int = None):
+    """
+    Pool initializer: loads the model once per process so pages never pay the start-up cost.
+    """
+    global _worker_ocr
+    if _worker_ocr is None:
+        _worker_ocr = _create_ocr(cpu_threads)
+
+
+def _ocr_page(path: str, page_no: int, dpi: int):
+    """
+    OCRs one page in the current process. Pages are rasterized here rather than in the parent
+    so only the path crosses the process boundary, not the image.
+    """
+    _init_worker()
+    started = time.perf_counter()
+    try:
+        image = rasterize_page(path, page_no, dpi) if is_pdf(path) else path
+        result = _worker_ocr.ocr(image, cls=True)
+        # line format: [[coords], [text, confidence]]
+        lines = [{"text": line[1][0], "confidence": float(line[1][1])} for line in (result[0] or [])] if result else []
+        confidence = sum(l["confidence"] for l in lines) / len(lines) if lines else 0.0
+        return {
+            "page": page_no + 1,
+            "text": "\n".join(l["text"] for l in lines),
+            "confidence": round(confidence, 4),
+            "lines": lines,
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+    except Exception as e:
+        return {"page": page_no + 1, "text": "", "confidence": 0.0, "lines": [], "error": f"OCR Processing Error: {str(e)}",
+                "seconds": round(time.perf_counter() - started, 4)}
+
+
+def get_pool(workers: int):
+    """
+    Process-wide OCR pool, created on first use and kept so the models stay warm between documents.
+    Shared by every task thread of the worker, so pages of concurrent documents run side by side.
+    Uses spawn so children never inherit a half-initialized Paddle runtime from the parent.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,),
+            )
+        return _pool
+
+
+def _warm_worker(_):
+    _init_worker()
+    return os.getpid()
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
 class OCRAgent:
-    def __init__(self):
-        if PaddleOCR:
-            # use_angle_cls=True for better accuracy on scanned docs
-            self.ocr = PaddleOCR(use_angle_cls=True, lang='en', show_log=False)
-        else:
-            self.ocr = None
+    def __init__(self, dpi: int = None, workers: int = None):
+        self.dpi = dpi or settings.OCR_DPI
+        self.workers = workers or settings.OCR_WORKERS
+        if self.workers > 1 and multiprocessing.current_process().daemon:
+            # Celery prefork children are daemonic and may not start processes of their own
+            print("Warning: OCR pool unavailable in a prefork worker process, pages run serially "
+                  "(run the OCR queue with --pool=threads or --pool=solo)")
+            self.workers = 1
+        self.ocr = PaddleOCR
+        if not PaddleOCR:
             print("Warning: PaddleOCR not installed. OCR will fail.")
 
+    def warm_up(self):
+        """
+        Loads the model ahead of the first document: in every pool process, or in this process when serial.
+        """
+        if not self.ocr:
+            return
+        if self.workers > 1:
+            try:
+                list(get_pool(self.workers).map(_warm_worker, range(self.workers)))
+                return
+            except (AssertionError, OSError, BrokenProcessPool) as e:
+                shutdown_pool()
+                print(f"Warning: OCR pool unavailable, warming up in-process: {e}")
+        _init_worker()
+
+    def extract_pages(self, file_path: str):
+        """
+        Per-page OCR results in page order: {"page", "text", "confidence", "lines"[, "error"]}.
+        Every page, including single-page documents and images, runs on the warm process pool when
+        OCR_WORKERS > 1, so the model is only ever loaded in the pool processes.
+        """
+        if not self.ocr:
+            return []
+
+        pages = page_count(file_path)
+        args = ([file_path] * pages, range(pages), [self.dpi] * pages)
+        if self.workers > 1:
+            try:
+                return self._observe(list(get_pool(self.workers).map(_ocr_page, *args)))
+            except (AssertionError, OSError, BrokenProcessPool) as e:
+                # e.g. daemonic worker processes cannot have children, or a worker died mid-batch
+                shutdown_pool()
+                print(f"Warning: OCR pool unavailable, running pages serially: {e}")
+        return self._observe([_ocr_page(*page_args) for page_args in zip(*args)])
+
+    @staticmethod
+    def _observe(pages):
+        # timed inside the page worker; recorded here so pool processes need no metrics connection
+        for page in pages:
+            metrics.observe("agenciai_ocr_page_seconds", page["seconds"])
+        return pages
+
     def extract_text(self, image_path: str):
         if not self.ocr:
             return "Error: OCR not available"
-        
+
         try:
-            result = self.ocr.ocr(image_path, cls=True)
-            text_lines = []
-            if result and result[0]:
-                for line in result[0]:
-                    # line format: [[coords], [text, confidence]]
-                    text_lines.append(line[1][0])
-            return "\n".join(text_lines)
+            pages = self.extract_pages(image_path)
         except Exception as e:
             return f"OCR Processing Error: {str(e)}"
+        if pages and all(p.get("error") for p in pages):
+            return pages[0]["error"]
+        return "\n\n".join(p["text"] for p in pages if p["text"])
@@ -1,8 +1,28 @@
-from agents.llm_client import LLMClient
+import json
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from agents.llm_client import LLMClient, parse_json_response
+
+def coerce_enrichment(item):
+    """
+    Normalizes one parsed LLM answer to {"specialties": [str, ...], "certification": str},
+    or None when it has any other shape (treated like a parse failure).
+    """
+    if not isinstance(item, dict):
+        return None
+    specialties = item.get("specialties") or []
+    certification = item.get("certification") or ""
+    if isinstance(specialties, str):
+        specialties = [specialties]
+    if not isinstance(specialties, list) or not all(isinstance(s, str) for s in specialties):
+        return None
+    if not isinstance(certification, str):
+        return None
+    return {"specialties": [s.strip() for s in specialties if s.strip()], "certification": certification.strip()}
 
 class EnrichmentAgent:
-    def __init__(self):
-        self.llm = LLMClient()
+    def __init__(self, llm: LLMClient = None):
+        self.llm = llm or LLMClient()
         
     def enrich_provider(self, provider_data):
         """
@@ -16,7 +36,56 @@ class EnrichmentAgent:
         Return as JSON: {{ "specialties": [], "certification": "" }}
         """
         response = self.llm.generate(prompt, system_prompt="You are a medical data assistant. Output JSON only.")
-        return response
+        enrichment = coerce_enrichment(parse_json_response(response))
+        return enrichment if enrichment is not None else {"raw": response}
+
+    def enrich_batch(self, providers, batch_size: int = None, concurrency: int = None):
+        """
+        Enriches many providers with few LLM calls: providers are packed into one prompt per batch
+        and batches run concurrently. Returns results aligned with `providers`.
+        """
+        batch_size = batch_size or settings.ENRICH_BATCH_SIZE
+        concurrency = concurrency or settings.ENRICH_CONCURRENCY
+        batches = [providers[i:i + batch_size] for i in range(0, len(providers), batch_size)]
+        if not batches:
+            return []
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            batch_results = list(pool.map(self._enrich_packed, batches))
+        return [item for batch in batch_results for item in batch]
+
+    def _enrich_packed(self, providers):
+        """
+        One LLM call for a batch; any provider missing from the parsed answer falls back to a single call.
+        """
+        if len(providers) == 1:
+            return [self.enrich_provider(providers[0])]
+
+        packed = [{"id": i, "provider": p} for i, p in enumerate(providers)]
+        prompt = f"""
+        For each provider below, suggest 3 likely medical specialties and 1 board certification based on their taxonomy.
+        Providers: {json.dumps(packed, default=str)}
+        Return a JSON array with exactly one object per provider, keeping its id:
+        [{{ "id": 0, "specialties": [], "certification": "" }}]
+        """
+        response = self.llm.generate(prompt, system_prompt="You are a medical data assistant. Output a JSON array only.")
+        parsed = parse_json_response(response)
+
+        by_id = {}
+        if isinstance(parsed, list):
+            for item in parsed:
+                if isinstance(item, dict) and isinstance(item.get("id"), int):
+                    enrichment = coerce_enrichment(item)
+                    if enrichment is not None:
+                        by_id[item["id"]] = enrichment
+
+        results = []
+        for i, provider in enumerate(providers):
+            if i in by_id:
+                results.append(by_id[i])
+            else:
+                results.append(self.enrich_provider(provider))
+        return results
 
 class QAAgent:
     def __init__(self):
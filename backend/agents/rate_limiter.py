@@ -0,0 +1,35 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """
+    Token-bucket rate limiter keyed by URL host.
+    Shared between threads so a concurrent batch never exceeds `rate` requests/sec per host.
+    """
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._buckets = {}  # host -> [tokens, last_refill]
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str):
+        """
+        Blocks until a request to the host of `url` is allowed.
+        """
+        if not self.rate or self.rate <= 0:
+            return
+        host = urlparse(url).netloc or url
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
@@ -1,8 +1,39 @@
-import requests
+import time
+from config import settings
+from metrics import metrics
+from agents.http_client import CircuitOpenError, HTTPClient, http_client
+from agents.normalizer import npi_check_digit
+from agents.rate_limiter import HostRateLimiter
+from agents.npi_cache import NPICache, npi_cache
+from agents.npi_index import NPIIndex, npi_index
+from agents.website_checker import WebsiteChecker, website_checker
+
+# Shared across all agents in the process so concurrent validation respects per-host limits
+default_rate_limiter = HostRateLimiter(settings.HOST_RATE_LIMIT)
+
+def npi_structure_error(npi_number: str):
+    """
+    Local structural check of a US NPI. Returns the rejection reason, or None if it is well-formed.
+    """
+    if not npi_number.isdigit():
+        return "NPI must contain only digits"
+    if len(npi_number) != 10:
+        return f"NPI must be 10 digits (got {len(npi_number)})"
+    expected = npi_check_digit(npi_number[:9])
+    if npi_number[9] != expected:
+        return f"NPI check digit mismatch (expected {expected}, got {npi_number[9]})"
+    return None
 
 class ValidationAgent:
-    def __init__(self):
-        self.api_url = "https://npiregistry.cms.hhs.gov/api/"
+    def __init__(self, rate_limiter: HostRateLimiter = None, cache: NPICache = None, index: NPIIndex = None,
+                 http: HTTPClient = None, website: WebsiteChecker = None):
+        self.api_url = settings.NPI_REGISTRY_URL
+        self.http = http or http_client
+        self.rate_limiter = rate_limiter or default_rate_limiter
+        self.cache = cache or npi_cache
+        self.index = index or npi_index
+        self.mode = settings.NPI_VALIDATION_MODE
+        self.website_checker = website or website_checker
 
     def validate_indian_registration(self, reg_number: str):
         """
@@ -36,73 +67,84 @@ class ValidationAgent:
 
         # Check if it's an Indian Registration Number (contains slash or letters)
         if '/' in npi_number or any(c.isalpha() for c in npi_number):
+            metrics.inc("agenciai_npi_lookups_total", source="registration")
             return self.validate_indian_registration(npi_number)
+
+        # Malformed NPIs never reach the network
+        structure_error = npi_structure_error(npi_number)
+        if structure_error:
+            metrics.inc("agenciai_npi_lookups_total", source="structure_check")
+            return {"valid": False, "reason": structure_error}
             
-        params = {
-            "version": "2.1",
-            "number": npi_number
-        }
-        
-        try:
-            response = requests.get(self.api_url, params=params, timeout=10)
-            if response.status_code == 200:
+        # Offline NPPES snapshot first; misses and stale entries go to the live registry
+        if self.mode == "index_first":
+            provider, fresh = self.index.lookup(npi_number)
+            if provider is not None and fresh:
+                metrics.inc("agenciai_npi_lookups_total", source="index")
+                return self._match_provider(npi_number, provider, first_name, last_name)
+
+        hit, provider = self.cache.get(npi_number)
+        metrics.inc("agenciai_npi_lookups_total", source="cache" if hit else "registry")
+        if not hit:
+            params = {
+                "version": "2.1",
+                "number": npi_number
+            }
+            
+            try:
+                self.rate_limiter.acquire(self.api_url)
+                started = time.perf_counter()
+                try:
+                    response = self.http.get(self.api_url, params=params, timeout=10)
+                finally:
+                    metrics.observe("agenciai_registry_request_seconds", time.perf_counter() - started)
+                if response.status_code != 200:
+                    metrics.inc("agenciai_registry_calls_total", outcome=f"http_{response.status_code}")
+                    return {"valid": False, "reason": f"API Error {response.status_code}"}
                 data = response.json()
-                if data.get("result_count", 0) > 0:
-                    provider = data["results"][0]
-                    basic = provider.get("basic", {})
-                    
-                    # Basic Name Match Logic
-                    api_first = basic.get("first_name", "").lower()
-                    api_last = basic.get("last_name", "").lower()
-                    
-                    match_score = 1.0
-                    if first_name and first_name.lower() not in api_first:
-                        match_score -= 0.3
-                    if last_name and last_name.lower() not in api_last:
-                        match_score -= 0.3
-                        
-                    return {
-                        "valid": True,
-                        "npi": npi_number,
-                        "primary_taxonomy": self._get_primary_taxonomy(provider),
-                        "status": basic.get("status"),
-                        "last_updated": basic.get("last_updated"),
-                        "match_score": max(0, match_score),
-                        "api_data": basic
-                    }
-                else:
-                    return {"valid": False, "reason": "NPI not found in registry"}
-            else:
-                return {"valid": False, "reason": f"API Error {response.status_code}"}
-        except Exception as e:
-            return {"valid": False, "reason": f"Connection Error: {str(e)}"}
+                provider = data["results"][0] if data.get("result_count", 0) > 0 else None
+                metrics.inc("agenciai_registry_calls_total", outcome="found" if provider else "not_found")
+                self.cache.set(npi_number, provider)
+            except CircuitOpenError:
+                metrics.inc("agenciai_registry_calls_total", outcome="circuit_open")
+                return {"valid": False, "reason": "Registry unavailable (circuit open)"}
+            except Exception as e:
+                metrics.inc("agenciai_registry_calls_total", outcome="error")
+                return {"valid": False, "reason": f"Connection Error: {str(e)}"}
+
+        if provider is None:
+            return {"valid": False, "reason": "NPI not found in registry"}
+
+        return self._match_provider(npi_number, provider, first_name, last_name)
+
+    def _match_provider(self, npi_number: str, provider, first_name: str = None, last_name: str = None):
+        basic = provider.get("basic", {})
+        
+        # Basic Name Match Logic
+        api_first = basic.get("first_name", "").lower()
+        api_last = basic.get("last_name", "").lower()
+        
+        match_score = 1.0
+        if first_name and first_name.lower() not in api_first:
+            match_score -= 0.3
+        if last_name and last_name.lower() not in api_last:
+            match_score -= 0.3
+            
+        return {
+            "valid": True,
+            "npi": npi_number,
+            "primary_taxonomy": self._get_primary_taxonomy(provider),
+            "status": basic.get("status"),
+            "last_updated": basic.get("last_updated"),
+            "match_score": max(0, match_score),
+            "api_data": basic
+        }
 
     def validate_website(self, url: str, expected_phone: str = None):
         """
-        Scrapes the provider's website to verify contact info.
+        Checks the provider's website is reachable and, if given, that the phone number appears on it.
         """
-        if not url:
-            return {"valid": False, "reason": "No URL provided"}
-            
-        try:
-            # In a real production agent, we would use Selenium or Playwright here.
-            # For this prototype, we'll use requests + BeautifulSoup to check for the phone number.
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                text = response.text
-                found_phone = False
-                if expected_phone and expected_phone.replace('-', '') in text.replace('-', ''):
-                     found_phone = True
-                     
-                return {
-                    "valid": True,
-                    "url_reachable": True,
-                    "phone_on_page": found_phone
-                }
-            else:
-                 return {"valid": False, "reason": f"Website unreachable (Status {response.status_code})"}
-        except Exception as e:
-            return {"valid": False, "reason": f"Scraping Error: {str(e)}"}
+        return self.website_checker.check(url, expected_phone)
 
     def _get_primary_taxonomy(self, provider_data):
         taxonomies = provider_data.get("taxonomies", [])
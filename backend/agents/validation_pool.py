@@ -0,0 +1,69 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import settings
+from metrics import metrics
+from agents.validation_agent import ValidationAgent
+from agents.normalizer import FLOAT_SUFFIX, npi_structure_reasons
+
+
+class ValidationPool:
+    """
+    Runs the network-bound validation stage (NPI registry + website checks) over a bounded thread pool.
+    Results are returned in input order.
+    """
+    def __init__(self, validator: ValidationAgent = None, max_workers: int = None):
+        self.validator = validator or ValidationAgent()
+        self.max_workers = max_workers or settings.VALIDATION_CONCURRENCY
+
+    @staticmethod
+    def clean_npi(record):
+        return re.sub(FLOAT_SUFFIX, '', str(record.get('npi', '')))  # Clean float strings
+
+    def validate_record(self, record):
+        with metrics.timer("agenciai_row_validation_seconds"):
+            npi = self.clean_npi(record)
+            val_res = self.validator.validate_npi(npi, record.get('first_name'), record.get('last_name'))
+
+            website_res = {}
+            if record.get('website'):
+                website_res = self.validator.validate_website(record.get('website'))
+        return val_res, website_res
+
+    def validate(self, records, progress_callback=None):
+        """
+        Validates all records concurrently.
+        progress_callback(done, total, record, count) is called from the calling thread as records complete;
+        count is how many records completed since the previous call.
+        Returns a list of (val_res, website_res) tuples aligned with `records`.
+        """
+        results = [None] * len(records)
+        if not records:
+            return results
+
+        # Structural NPI prefilter over the whole batch: malformed NPIs are rejected without a network call
+        reasons = npi_structure_reasons([self.clean_npi(r) for r in records]).tolist()
+        done = 0
+        last_rejected = None
+        for idx, reason in enumerate(reasons):
+            if reason:
+                results[idx] = ({"valid": False, "reason": reason}, {})
+                done += 1
+                last_rejected = idx
+        metrics.inc("agenciai_npi_lookups_total", done, source="structure_check")
+        if done and progress_callback:
+            progress_callback(done, len(records), records[last_rejected], done)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self.validate_record, r): idx
+                for idx, r in enumerate(records) if not reasons[idx]
+            }
+            for done, future in enumerate(as_completed(futures), start=done + 1):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    results[idx] = ({"valid": False, "reason": f"Validation Error: {str(e)}"}, {})
+                if progress_callback:
+                    progress_callback(done, len(records), records[idx], 1)
+        return results
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import urlparse, urlunparse
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError, ReadTimeoutError
+from config import settings
+from metrics import metrics
+from agents.http_client import CircuitOpenError, HTTPClient
+from agents.rate_limiter import HostRateLimiter
+
+# HEAD is not supported everywhere; these mean "try GET instead"
+HEAD_UNSUPPORTED = (403, 405, 501)
+
+
+def is_timeout(error: Exception) -> bool:
+    """
+    True for connect/read timeouts, including the ones requests reports as ConnectionError
+    (urllib3 wraps exhausted read timeouts in MaxRetryError).
+    """
+    if isinstance(error, requests.Timeout):
+        return True
+    cause = error.args[0] if error.args else None
+    cause = getattr(cause, "reason", cause)
+    # NewConnectionError (refused, DNS failure) subclasses ConnectTimeoutError but is a definite failure
+    return isinstance(cause, (ConnectTimeoutError, ReadTimeoutError)) and not isinstance(cause, NewConnectionError)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used for dedup: scheme added if missing, host lower-cased, fragment and trailing slash dropped.
+    """
+    url = str(url).strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlparse(url)
+    path = parts.path.rstrip("/")
+    return urlunparse((parts.scheme.lower(), parts.netloc.lower(), path, "", parts.query, ""))
+
+
+class WebsiteChecker:
+    """
+    Website reachability / phone checks:
+    - HEAD-first probing when only reachability is needed
+    - streamed GET capped at max_bytes, stopping as soon as the phone number is found
+    - per-URL TTL/LRU cache with in-flight dedup, plus a per-domain memo of connection failures
+      (timeouts are cached briefly, open-circuit results not at all)
+    """
+    def __init__(self, http: HTTPClient = None, rate_limiter: HostRateLimiter = None,
+                 max_bytes: int = None, cache_ttl: int = None, max_entries: int = None):
+        # No retries: a probe costs at most one WEBSITE_TIMEOUT, and one failed check says enough
+        self.http = http or HTTPClient(retries=0)
+        self.rate_limiter = rate_limiter
+        self.max_bytes = max_bytes or settings.WEBSITE_MAX_BYTES
+        self.cache_ttl = settings.WEBSITE_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.timeout_ttl = min(settings.WEBSITE_TIMEOUT_TTL, self.cache_ttl)
+        self.max_entries = max_entries or settings.WEBSITE_CACHE_SIZE
+        self.timeout = settings.WEBSITE_TIMEOUT
+        self._cache = OrderedDict()            # (url, phone) -> (expires_at, result)
+        self._domain_failures = OrderedDict()  # host -> (expires_at, result)
+        self._inflight = {}                    # (url, phone) -> Future
+        self._lock = threading.Lock()
+
+    def _get_fresh(self, entries: OrderedDict, key, now: float):
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, entries: OrderedDict, key, expires_at: float, result):
+        entries[key] = (expires_at, result)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def check(self, url: str, expected_phone: str = None):
+        if not url:
+            return {"valid": False, "reason": "No URL provided"}
+
+        url = normalize_url(url)
+        phone = expected_phone.replace('-', '') if expected_phone else None
+        key = (url, phone)
+        host = urlparse(url).netloc
+
+        with self._lock:
+            now = time.time()
+            cached = self._get_fresh(self._cache, key, now)
+            if cached is not None:
+                return dict(cached)
+            failed = self._get_fresh(self._domain_failures, host, now)
+            if failed is not None:
+                return dict(failed)
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return dict(future.result())
+
+        try:
+            result, ttl, domain_down = self._probe(url, phone)
+        except Exception as e:
+            result, ttl, domain_down = {"valid": False, "reason": f"Scraping Error: {str(e)}"}, self.cache_ttl, False
+
+        with self._lock:
+            if ttl > 0:
+                expires = time.time() + ttl
+                self._put(self._cache, key, expires, result)
+                if domain_down:
+                    self._put(self._domain_failures, host, expires, result)
+            del self._inflight[key]
+        future.set_result(result)
+        return dict(result)
+
+    def _probe(self, url: str, phone: str):
+        """
+        Returns (result, cache ttl, domain_down). domain_down marks connection-level failures shared by the whole host.
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+
+        try:
+            if not phone:
+                with metrics.timer("agenciai_website_check_seconds", method="HEAD"):
+                    response = self.http.head(url, timeout=self.timeout, allow_redirects=True)
+                if response.status_code not in HEAD_UNSUPPORTED:
+                    return self._reachability(response.status_code, phone_on_page=False), self.cache_ttl, False
+            with metrics.timer("agenciai_website_check_seconds", method="GET"):
+                return self._stream_get(url, phone), self.cache_ttl, False
+        except CircuitOpenError as e:
+            # Says nothing about this site; checked again as soon as the circuit closes
+            return {"valid": False, "reason": f"Scraping Error: {str(e)}"}, 0, False
+        except (requests.Timeout, requests.ConnectionError) as e:
+            ttl = self.timeout_ttl if is_timeout(e) else self.cache_ttl
+            return {"valid": False, "reason": f"Scraping Error: {str(e)}"}, ttl, True
+        except Exception as e:
+            return {"valid": False, "reason": f"Scraping Error: {str(e)}"}, self.cache_ttl, False
+
+    def _stream_get(self, url: str, phone: str):
+        with self.http.get(url, timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                return self._reachability(response.status_code, phone_on_page=False)
+            if not phone:
+                return self._reachability(200, phone_on_page=False)
+
+            found = False
+            read = 0
+            window = ""
+            for chunk in response.iter_content(chunk_size=16384):
+                read += len(chunk)
+                # Keep a tail so numbers split across chunk boundaries still match
+                window = window[-len(phone):] + chunk.decode(response.encoding or "utf-8", errors="ignore").replace('-', '')
+                if phone in window:
+                    found = True
+                    break
+                if read >= self.max_bytes:
+                    break
+            return self._reachability(200, phone_on_page=found)
+
+    @staticmethod
+    def _reachability(status_code: int, phone_on_page: bool):
+        if status_code == 200:
+            return {"valid": True, "url_reachable": True, "phone_on_page": phone_on_page}
+        return {"valid": False, "reason": f"Website unreachable (Status {status_code})"}
+
+
+# Websites get their own per-host limiter; registry hosts are throttled by ValidationAgent
+website_checker = WebsiteChecker(rate_limiter=HostRateLimiter(settings.HOST_RATE_LIMIT))
@@ -1,164 +1,512 @@
-from celery import Celery
+from celery import Celery, chord
+from celery.signals import task_failure, task_revoked, task_success, worker_init, worker_process_init
 from config import settings
-from agents.llm_client import LLMClient
-from agents.validation_agent import ValidationAgent
-from agents.ocr_agent import OCRAgent
-from agents.qa_enrichment import EnrichmentAgent, QAAgent
-from agents.directory_agent import DirectoryManagementAgent
+from agents.validation_pool import ValidationPool
+from agents.normalizer import normalize_records
+from agent_registry import agent_registry
+from result_store import result_store
+from chat_index import chat_index
+from provider_store import provider_store
+from progress import progress_tracker
+from metrics import metrics, error_reason, profiled
+from job_routing import tenant_limiter, bulk_priority, PRIORITY_STEPS
 import pandas as pd
-import json
+import csv
+import gzip
+import io
 import os
+import zipfile
+import threading
+import time
+from datetime import datetime
 
 celery_app = Celery(
     "agenciai",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL
 )
+celery_app.conf.update(
+    # Uploads are routed to "interactive" / "bulk" / "ocr" by the API; anything else (fan-out chunks) is bulk work
+    task_default_queue="bulk",
+    broker_transport_options={"priority_steps": PRIORITY_STEPS, "sep": ":", "queue_order_strategy": "priority"},
+    # A worker reserves one task at a time, so queued short jobs are never stuck behind a long one it prefetched
+    worker_prefetch_multiplier=1,
+)
+
+def set_step(task, step: str, job_id: str = None, **fields):
+    """
+    Publishes a pipeline step to the Celery task meta and to the compact progress record.
+    """
+    job_id = job_id or task.request.id
+    task.update_state(task_id=job_id, state='PROGRESS', meta={'step': step, **fields})
+    progress_tracker.update(job_id, state='PROGRESS', step=step, total=fields.get('total'))
+    tenant_limiter.refresh(job_id)
+
+def open_csv_binary(file_path: str):
+    """
+    Opens the CSV bytes of a plain, gzip (.gz) or single-file .zip upload (seekable; compressed
+    streams seek by decompressing forward).
+    """
+    lower = file_path.lower()
+    if lower.endswith('.gz'):
+        return gzip.open(file_path, 'rb')
+    if lower.endswith('.zip'):
+        archive = zipfile.ZipFile(file_path)
+        members = [m for m in archive.namelist() if not m.endswith('/')]
+        if len(members) != 1:
+            archive.close()
+            raise ValueError(f"Zip upload must contain exactly one CSV file (found {len(members)})")
+        member = archive.open(members[0])
+        archive.close()  # the archive file stays open until the member is closed
+        return member
+    return open(file_path, 'rb')
+
+def open_csv_text(file_path: str):
+    """
+    Opens a CSV for streaming text reads: plain, gzip (.gz) or a single-file .zip archive.
+    Every reader (API checks and worker) goes through here, so all decode undecodable bytes the same way.
+    """
+    return io.TextIOWrapper(open_csv_binary(file_path), newline='', encoding='utf-8', errors='replace')
+
+def count_csv_rows(file_path: str):
+    """
+    Counts data rows with a streaming pass (handles quoted newlines and compressed files, constant memory).
+    Blank lines are skipped, as in read_csv_chunks.
+    """
+    with open_csv_text(file_path) as f:
+        return max(0, sum(1 for row in csv.reader(f) if row) - 1)
+
+def csv_uncompressed_size(file_path: str):
+    """
+    Size of the CSV text in bytes without decompressing: gzip's ISIZE trailer (modulo 4 GiB) or the zip entry size.
+    """
+    lower = file_path.lower()
+    if lower.endswith('.gz'):
+        with open(file_path, 'rb') as f:
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), 'little')
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(file_path) as archive:
+            return sum(info.file_size for info in archive.infolist())
+    return os.path.getsize(file_path)
+
+def estimate_csv_rows(file_path: str, sample_bytes: int = 64 * 1024):
+    """
+    Data rows for job routing: exact when the file fits in the sample, otherwise extrapolated from
+    the mean line length of the sample.
+    """
+    with open_csv_text(file_path) as f:
+        sample = f.read(sample_bytes)
+        exhausted = not f.read(1)
+    if exhausted:
+        return max(0, sum(1 for row in csv.reader(io.StringIO(sample)) if row) - 1)
+    lines = max(1, sample.count('\n'))
+    return max(0, int(csv_uncompressed_size(file_path) / (len(sample.encode('utf-8')) / lines)) - 1)
+
+def sanitize_column_map(col_map: dict):
+    """
+    Ensures every mapped value is a single column name (or None).
+    """
+    sanitized_map = {}
+    for k, v in col_map.items():
+        if isinstance(v, str):
+            sanitized_map[k] = v
+        elif isinstance(v, list) and len(v) > 0 and isinstance(v[0], str):
+            sanitized_map[k] = v[0] # Take first if list
+        else:
+             sanitized_map[k] = None
+    return sanitized_map
+
+def read_csv_columns(file_path: str):
+    with open_csv_text(file_path) as f:
+        return list(pd.read_csv(f, nrows=0).columns)
+
+def csv_chunk_offsets(file_path: str, chunk_size: int):
+    """
+    Byte offset of the first row of every `chunk_size`-row slice, found in one streaming pass
+    (constant memory). A row ends at a newline outside quotes; blank lines are skipped like pandas does.
+    """
+    offsets = []
+    position = 0
+    row = -1  # the header row
+    in_quotes = False
+    with open_csv_binary(file_path) as f:
+        for line in f:
+            if not in_quotes and line.strip():
+                if row >= 0 and row % chunk_size == 0:
+                    offsets.append(position)
+                row += 1
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            position += len(line)
+    return offsets
+
+def read_csv_slice(file_path: str, byte_offset: int, nrows: int, columns):
+    """
+    Reads `nrows` rows starting at a csv_chunk_offsets() position, as all-string columns.
+    """
+    with open_csv_binary(file_path) as raw:
+        raw.seek(byte_offset)
+        with io.TextIOWrapper(raw, newline='', encoding='utf-8', errors='replace') as f:
+            return pd.read_csv(f, header=None, names=columns, nrows=nrows, dtype=str, keep_default_na=False)
+
+def read_csv_chunks(file_path: str, chunksize: int):
+    """
+    Streams the CSV as all-string chunks so IDs never round-trip through floats.
+    """
+    with open_csv_text(file_path) as f:
+        yield from pd.read_csv(f, chunksize=chunksize, dtype=str, keep_default_na=False)
+
+def validate_records(task, records, validator, enricher, qa, offset: int, total: int, job_id: str):
+    """
+    Runs Validation -> Enrichment -> QA over records that need (re)validation.
+    """
+    results = []
+    validated_at = datetime.now().isoformat()
+
+    # Agent 1: Validation (concurrent, network-bound)
+    def on_validated(done, batch_total, record, count):
+        provider = f"{record.get('first_name')} {record.get('last_name')}"
+        if task.request.id == job_id:
+            # fan-out chunks report through the shared progress record only
+            task.update_state(task_id=job_id, state='PROGRESS', meta={
+                'step': 'Validating Provider',
+                'current': offset + done,
+                'total': total,
+                'provider': provider
+            })
+        progress_tracker.incr(job_id, current=count, step='Validating Provider', provider=provider)
+        tenant_limiter.refresh(job_id)
+
+    with metrics.stage("validation", job_id):
+        validated = ValidationPool(validator).validate(records, progress_callback=on_validated)
+    for val_res, _ in validated:
+        if not val_res['valid']:
+            metrics.inc("agenciai_errors_total", stage="validation", reason=error_reason(val_res.get('reason')))
+
+    # Agent 2: Enrichment (LLM Hallucination/Search), batched over the valid providers
+    valid_idx = [i for i, (val_res, _) in enumerate(validated) if val_res['valid']]
+    with metrics.stage("enrichment", job_id):
+        enriched = dict(zip(valid_idx, enricher.enrich_batch([validated[i][0]['api_data'] for i in valid_idx])))
+
+    with metrics.stage("qa", job_id):
+        for idx, (record, (val_res, website_res)) in enumerate(zip(records, validated)):
+            website = record.get('website')
+            enrich_res = enriched.get(idx, {})
+
+            # Agent 3: QA Scoring
+            score, issues = qa.score_provider(val_res)
+            if not website_res.get('valid', True) and website: # if website check failed
+                 score -= 0.1
+                 issues.append(f"Website unreachable: {website}")
+                 metrics.inc("agenciai_errors_total", stage="website", reason=error_reason(website_res.get('reason')))
+
+            results.append({
+                "record": record,
+                "validation_status": "Valid" if score > 0.8 else "Needs Review",
+                "confidence_score": score,
+                "issues": issues,
+                "api_data": val_res,
+                "website_validation": website_res,
+                "enriched": enrich_res,
+                "validated_at": validated_at
+            })
+    return results
+
+def process_records(task, records, validator, enricher, qa, offset: int = 0, total: int = None, job_id: str = None,
+                    incremental: bool = None):
+    """
+    Processes one batch of records in input order.
+    offset/total place the batch within the whole job for progress reporting;
+    job_id routes progress to the parent upload task when running as a fan-out chunk.
+    incremental reuses the stored result of rows that are unchanged since a recent run
+    (defaults to settings.INCREMENTAL_VALIDATION); reused rows are marked "reused".
+    """
+    total = total if total is not None else len(records)
+    job_id = job_id or task.request.id
+    if incremental is None:
+        incremental = settings.INCREMENTAL_VALIDATION
+
+    with metrics.stage("incremental_lookup", job_id):
+        reused = provider_store.lookup(records) if incremental else {}
+    if reused:
+        progress_tracker.incr(job_id, current=len(reused), skipped=len(reused))
 
-@celery_app.task(bind=True)
-def process_upload_task(self, file_path: str, input_type: str = "csv"):
+    pending = [record for i, record in enumerate(records) if i not in reused]
+    fresh = validate_records(task, pending, validator, enricher, qa, offset + len(reused), total, job_id) if pending else []
+    if incremental:
+        with metrics.stage("incremental_save", job_id):
+            provider_store.save(pending, fresh)
+
+    results = []
+    fresh_results = iter(fresh)
+    for i, record in enumerate(records):
+        if i in reused:
+            results.append({"record": record, **reused[i], "reused": True})
+        else:
+            results.append(next(fresh_results))
+
+    valid = sum(1 for r in results if r['validation_status'] == 'Valid')
+    progress_tracker.incr(job_id, valid=valid, flagged=len(results) - valid)
+    metrics.inc("agenciai_rows_total", valid, outcome="valid")
+    metrics.inc("agenciai_rows_total", len(results) - valid, outcome="flagged")
+    metrics.inc("agenciai_rows_total", len(reused), outcome="reused")
+    metrics.flush()
+    return results
+
+def build_task_result(job_id: str):
+    """
+    Directory Management (Reporting): the final payload shared by single-task and fan-out runs.
+    Full rows and the full report stay in the result store; the Celery result only keeps
+    a summary and a pointer, so polling /task never moves the whole dataset through Redis.
+    """
+    directory_agent = agent_registry.get("directory")
+    quality_metrics = {"accuracy": 0.95} # Mock metric or calculate real one
+    with metrics.stage("reporting", job_id):
+        final_report = directory_agent.generate_report(result_store.iter_results(job_id), quality_metrics)
+    processed = final_report['total_processed']
+    with metrics.stage("chat_index", job_id):
+        try:
+            chat_index.build(job_id)
+        except Exception as e:
+            print(f"Warning: could not build chat index for {job_id}: {e}")
+            metrics.inc("agenciai_errors_total", stage="chat_index", reason=error_reason(e))
+
+    # Per-stage timing breakdown, summed over every worker that ran part of the job
+    final_report['timings'] = metrics.task_timings(job_id)
+    result_store.save_report(job_id, processed, final_report)
+    metrics.inc("agenciai_tasks_total", state="SUCCESS")
+
+    summary = {k: v for k, v in final_report.items() if k != 'action_items'}
+    summary['action_items_count'] = len(final_report['action_items'])
+    tenant_limiter.release(job_id)
+    return {"processed": processed, "report": summary, "result_store": {"task_id": job_id, "rows": processed}}
+
+@celery_app.task(bind=True, max_retries=None)
+def process_chunk_task(self, file_path: str, offset: int, chunk_size: int, col_map: dict, byte_offset: int, columns,
+                       total: int, job_id: str = None, incremental: bool = None, tenant: str = None):
+    """
+    Fan-out worker: reads one fixed-size slice of an upload (rows offset..offset+chunk_size, starting at
+    byte_offset) straight from the file, validates it and stores it under the parent job.
+    tenant: the chunk holds one of the tenant's "chunk" slots while it runs, so one large upload
+            cannot take over the bulk pool; while none is free it is requeued like an upload.
+    """
+    if tenant and not tenant_limiter.acquire(tenant, "chunk", self.request.id):
+        raise self.retry(countdown=settings.TENANT_RETRY_DELAY,
+                         priority=(self.request.delivery_info or {}).get('priority'))
+    try:
+        with metrics.stage("csv_parse", job_id):
+            records = normalize_records(read_csv_slice(file_path, byte_offset, chunk_size, columns), col_map)
+        validator = agent_registry.get("validator")
+        enricher = agent_registry.get("enricher")
+        qa = agent_registry.get("qa")
+        results = process_records(self, records, validator, enricher, qa, offset=offset, total=total, job_id=job_id,
+                                  incremental=incremental)
+        with metrics.stage("store", job_id):
+            result_store.append(job_id, results, offset=offset)
+    finally:
+        if tenant:
+            tenant_limiter.release(self.request.id)
+    return {"offset": offset, "rows": len(results)}
+
+@celery_app.task
+def merge_results_task(partials, job_id: str):
+    """
+    Chord reducer: chunks are already stored in row order, so this only builds the report.
+    """
+    return build_task_result(job_id)
+
+@celery_app.task
+def release_tenant_slot(job_id: str):
+    """
+    Chord error callback: frees the tenant slot of a fan-out job whose chunks failed.
+    """
+    tenant_limiter.release(job_id)
+
+# Waiting for a tenant slot is a retry, never a failure: no retry cap
+@celery_app.task(bind=True, max_retries=None)
+def process_upload_task(self, file_path: str, input_type: str = "csv", fanout: bool = None, incremental: bool = None,
+                        profile: bool = False, tenant: str = None, job_class: str = None, queued_at: float = None):
     """
     Orchestrates the Multi-Agent Pipeline.
     input_type: "csv" or "pdf"
+    fanout: split the upload into FANOUT_CHUNK_SIZE chunks processed across the worker pool
+            (defaults to settings.FANOUT_ENABLED).
+    incremental: reuse results of rows unchanged since a recent run; False revalidates everything
+                 (defaults to settings.INCREMENTAL_VALIDATION).
+    profile: capture a profile of this run under PROFILE_DIR (fan-out chunks are not included).
+    tenant/job_class: the job holds one of the tenant's TENANT_JOB_LIMITS slots for its class until it
+                      finishes; while none is free it is requeued every TENANT_RETRY_DELAY seconds.
+    queued_at: enqueue time (epoch seconds) for the queue wait metric.
     """
-    self.update_state(state='STARTED', meta={'step': 'Initializing Agents'})
-    
-    llm = LLMClient()
-    validator = ValidationAgent()
-    enricher = EnrichmentAgent()
-    qa = QAAgent()
-    directory_agent = DirectoryManagementAgent()
-    
-    records = []
-    
+    if tenant and job_class and not tenant_limiter.acquire(tenant, job_class, self.request.id):
+        progress_tracker.update(self.request.id, state='PENDING', step='Waiting for a free slot (tenant limit)')
+        raise self.retry(countdown=settings.TENANT_RETRY_DELAY, queue=job_class,
+                         priority=(self.request.delivery_info or {}).get('priority'))
+    if queued_at:
+        metrics.observe("agenciai_queue_wait_seconds", max(0.0, time.time() - queued_at), job_class=job_class or "default")
+
+    if profile:
+        with profiled(self.request.id):
+            return run_pipeline(self, file_path, input_type, fanout, incremental, tenant)
+    return run_pipeline(self, file_path, input_type, fanout, incremental, tenant)
+
+def run_pipeline(task, file_path: str, input_type: str, fanout: bool, incremental: bool, tenant: str = None):
+    task.update_state(state='STARTED', meta={'step': 'Initializing Agents'})
+    progress_tracker.start(task.request.id, 'Initializing Agents')
+
+    llm = agent_registry.get("llm")
+    validator = agent_registry.get("validator")
+    enricher = agent_registry.get("enricher")
+    qa = agent_registry.get("qa")
+
+    job_id = task.request.id
+    result_store.clear(job_id)
+
     # --- STEP 1: Ingestion & OCR ---
     if input_type == "pdf":
-        self.update_state(state='PROGRESS', meta={'step': 'OCR Processing (Scanning PDF)...'})
-        ocr = OCRAgent()
-        # For Hackathon, assuming single page or converting first page to image
-        # In Docker we use pdf2image or just assume the 'pdf' is actually an image for simplicity if pdf2image missing
-        # BUT we installed system deps, so let's try direct OCR on path if Paddle supports it, or assume it's an image
-        # PaddleOCR supports PDF paths directly.
-        
-        raw_text = ocr.extract_text(file_path)
-        
-        self.update_state(state='PROGRESS', meta={'step': 'Extracting Data from OCR Text...'})
-        # Use LLM to parse unstructured text into JSON list
-        prompt = f"""
-        Extract provider information from this OCR text into a JSON list.
-        Fields: npi (string), first_name, last_name, website (optional).
-        Text:
-        {raw_text[:3000]}
-        """
-        response = llm.generate(prompt, system_prompt="Output JSON list of objects only.")
-        try:
-            clean_json = response.strip().replace("```json", "").replace("```", "")
-            records = json.loads(clean_json)
-        except:
-             records = [] # Fail gracefully
-             
+        set_step(task, 'OCR Processing (Scanning PDF)...')
+        ocr = agent_registry.get("ocr")
+        with metrics.stage("ocr", job_id):
+            try:
+                pages = ocr.extract_pages(file_path)
+            except Exception as e:
+                print(f"OCR failed for {file_path}: {e}")
+                metrics.inc("agenciai_errors_total", stage="ocr", reason=error_reason(e))
+                pages = []
+        progress_tracker.update(job_id, ocr_pages=len(pages))
+
+        set_step(task, 'Extracting Data from OCR Text...')
+        # Chunked LLM extraction over every page; records are merged and deduplicated
+        with metrics.stage("extraction", job_id):
+            records = agent_registry.get("extractor").extract([p["text"] for p in pages])
+
+        # --- STEP 2: Validation ---
+        progress_tracker.update(job_id, total=len(records))
+        results = process_records(task, records, validator, enricher, qa, incremental=incremental)
+        with metrics.stage("store", job_id):
+            result_store.append(job_id, results)
+
     else: # CSV
-        self.update_state(state='PROGRESS', meta={'step': 'Mapping CSV Columns...'})
-        df = pd.read_csv(file_path)
-        col_map = llm.map_csv_columns(list(df.columns))
-        
-        # Sanitize col_map: ensure values are strings
-        sanitized_map = {}
-        for k, v in col_map.items():
-            if isinstance(v, str):
-                sanitized_map[k] = v
-            elif isinstance(v, list) and len(v) > 0 and isinstance(v[0], str):
-                sanitized_map[k] = v[0] # Take first if list
-            else:
-                 sanitized_map[k] = None
-
-        col_map = sanitized_map
-        
-        raw_records = df.head(50).to_dict(orient='records')
-        for r in raw_records:
-            # Handle NPI or Registration Number
-            npi_val = str(r.get(col_map.get('npi')) or '')
-            
-            # If NPI is missing/mapped to None, try finding 'registration_number' or similar in raw columns if LLM failed
-            if not npi_val or npi_val == 'nan' or npi_val == 'None':
-                 # Heuristic backup: look for 'registration' in keys
-                 for key in r.keys():
-                     if 'registration' in key.lower() or 'reg_no' in key.lower():
-                         npi_val = str(r[key])
-                         break
-
-            # Handle Name Parsing (Full Name -> First/Last)
-            first_name = r.get(col_map.get('first_name'))
-            last_name = r.get(col_map.get('last_name'))
-            
-            if not first_name and not last_name:
-                 # Check for 'full_name' or 'name' column
-                 full_name_val = ""
-                 for key in r.keys():
-                     if 'full_name' in key.lower() or 'provider_name' in key.lower():
-                         full_name_val = str(r[key])
-                         break
-                 
-                 if full_name_val:
-                     parts = full_name_val.replace("Dr.", "").strip().split(' ')
-                     if len(parts) > 0:
-                         first_name = parts[0]
-                         last_name = " ".join(parts[1:]) if len(parts) > 1 else ""
-
-            records.append({
-                "npi": npi_val,
-                "first_name": first_name,
-                "last_name": last_name,
-                "website": r.get(col_map.get('website'))
-            })
+        set_step(task, 'Mapping CSV Columns...')
+        with metrics.stage("column_mapping", job_id):
+            columns = read_csv_columns(file_path)
+            col_map = sanitize_column_map(llm.map_csv_columns(columns))
+
+        set_step(task, 'Counting Rows...')
+        with metrics.stage("row_count", job_id):
+            total = count_csv_rows(file_path)
+        progress_tracker.update(job_id, total=total)
+
+        if fanout is None:
+            fanout = settings.FANOUT_ENABLED
+        if fanout and total > settings.FANOUT_CHUNK_SIZE:
+            # --- STEP 2 (fan-out): one subtask per chunk, reduced by a chord callback ---
+            # Chunks only carry the file position of their slice, never the rows themselves
+            set_step(task, 'Dispatching Chunks...', current=0, total=total)
+            chunk_size = settings.FANOUT_CHUNK_SIZE
+            with metrics.stage("chunk_offsets", job_id):
+                offsets = csv_chunk_offsets(file_path, chunk_size)
+            # Chunks queue behind other tenants' bulk jobs of the same size, never ahead of them
+            priority = max((task.request.delivery_info or {}).get('priority') or 0, bulk_priority(total))
+            header = [
+                process_chunk_task.s(file_path, i * chunk_size, chunk_size, col_map, byte_offset, columns, total,
+                                     job_id, incremental, tenant=tenant).set(priority=priority)
+                for i, byte_offset in enumerate(offsets)
+            ]
+            metrics.flush()
+            # The chord callback inherits this task's id, so clients keep polling the same task
+            # A failed chunk fails the chord once every chunk has finished; the error callback then frees the slot
+            callback = merge_results_task.s(job_id=job_id).set(priority=priority)
+            callback.on_error(release_tenant_slot.si(job_id))
+            return task.replace(chord(header, callback))
+
+        # --- STEP 2: Streamed Validation (bounded memory, one chunk at a time) ---
+        offset = 0
+        chunks = iter(read_csv_chunks(file_path, settings.CSV_CHUNK_SIZE))
+        while True:
+            with metrics.stage("csv_parse", job_id):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                records = normalize_records(chunk, col_map)
+            results = process_records(task, records, validator, enricher, qa, offset=offset, total=total,
+                                      incremental=incremental)
+            with metrics.stage("store", job_id):
+                result_store.append(job_id, results, offset=offset)
+            offset += len(results)
 
-    results = []
-    
-    # --- STEP 2: Validation Loop ---
-    for idx, record in enumerate(records):
-        npi = str(record.get('npi', '')).replace('.0', '') # Clean float strings
-        fname = record.get('first_name')
-        lname = record.get('last_name')
-        website = record.get('website')
-        
-        self.update_state(state='PROGRESS', meta={
-            'step': 'Validating Provider', 
-            'current': idx + 1, 
-            'total': len(records),
-            'provider': f"{fname} {lname}"
-        })
-        
-        # Agent 1: Validation (Real API + Scraping)
-        val_res = validator.validate_npi(npi, fname, lname)
-        
-        website_res = {}
-        if website:
-             website_res = validator.validate_website(website)
-        
-        # Agent 2: Enrichment (LLM Hallucination/Search)
-        enrich_res = {}
-        if val_res['valid']:
-            enrich_res = enricher.enrich_provider(val_res['api_data'])
-            
-        # Agent 3: QA Scoring
-        score, issues = qa.score_provider(val_res)
-        if not website_res.get('valid', True) and website: # if website check failed
-             score -= 0.1
-             issues.append(f"Website unreachable: {website}")
-        
-        results.append({
-            "record": record,
-            "validation_status": "Valid" if score > 0.8 else "Needs Review",
-            "confidence_score": score,
-            "issues": issues,
-            "api_data": val_res,
-            "website_validation": website_res,
-            "enriched": enrich_res
-        })
-        
     # --- STEP 3: Directory Management (Reporting) ---
-    self.update_state(state='PROGRESS', meta={'step': 'Generating Directory Report...'})
-    metrics = {"accuracy": 0.95} # Mock metric or calculate real one
-    final_report = directory_agent.generate_report(results, metrics)
-        
-    return {"processed": len(records), "data": results, "report": final_report}
+    set_step(task, 'Generating Directory Report...')
+    return build_task_result(job_id)
+
+@worker_process_init.connect
+def warm_up_agents(**kwargs):
+    """
+    Loads the heavy agents once per worker process. Runs in the background because Celery kills
+    child processes that take too long in worker_process_init; tasks arriving early simply wait
+    for the agent they need. Pooled database connections inherited from the parent are dropped
+    (without closing them under the parent) so each child opens its own.
+    """
+    for engine in {id(store.engine): store.engine for store in (result_store, chat_index, provider_store)}.values():
+        engine.dispose(close=False)
+    agent_registry.reset()
+    threading.Thread(target=agent_registry.warm_up, name="agent-warmup", daemon=True).start()
+
+@worker_init.connect
+def warm_up_main_process(sender=None, **kwargs):
+    """
+    Thread and solo pools (the OCR queue) run tasks in the worker's main process, where
+    worker_process_init never fires.
+    """
+    if "prefork" not in str(getattr(sender, "pool_cls", "prefork")):
+        threading.Thread(target=agent_registry.warm_up, name="agent-warmup", daemon=True).start()
+
+@task_success.connect
+def mark_progress_succeeded(sender=None, result=None, **kwargs):
+    """
+    Marks the upload job completed on its progress record. Runs after Celery has stored the task
+    result, so a client that sees SUCCESS there can read GET /task/{id} straight away.
+    """
+    if sender not in (process_upload_task, merge_results_task) or not isinstance(result, dict):
+        return
+    job_id = result['result_store']['task_id']
+    processed = result['processed']
+    try:
+        progress_tracker.update(job_id, state='SUCCESS', step='Completed', current=processed, total=processed)
+    except Exception as e:
+        print(f"Could not record task success: {e}")
+
+@task_failure.connect
+def mark_progress_failed(sender=None, task_id=None, exception=None, args=None, kwargs=None, **extra):
+    """
+    Records failures on the progress record of the upload job (fan-out chunks report to their parent)
+    and frees the job's tenant slot. A failed chunk keeps the slot: its siblings are still running,
+    and release_tenant_slot frees it when the chord fails.
+    """
+    job_id = task_id
+    if sender is process_chunk_task:
+        job_id = (kwargs or {}).get('job_id') or (args[7] if args and len(args) > 7 else task_id)
+    metrics.inc("agenciai_tasks_total", state="FAILURE")
+    metrics.inc("agenciai_errors_total", stage="task", reason=error_reason(type(exception).__name__))
+    metrics.flush()
+    try:
+        progress_tracker.update(job_id, state='FAILURE', step=f"Failed: {exception}")
+        if sender is not process_chunk_task:
+            tenant_limiter.release(job_id)
+    except Exception as e:
+        print(f"Could not record task failure: {e}")
+
+@task_revoked.connect
+def mark_progress_revoked(sender=None, request=None, **kwargs):
+    """
+    Records a revoked upload job on its progress record (otherwise it keeps its last PROGRESS snapshot)
+    and frees its tenant slot.
+    """
+    if sender not in (process_upload_task, merge_results_task) or request is None:
+        return
+    try:
+        progress_tracker.update(request.id, state='REVOKED', step='Revoked')
+        tenant_limiter.release(request.id)
+    except Exception as e:
+        print(f"Could not record task revocation: {e}")
@@ -0,0 +1,285 @@
+import re
+from sqlalchemy import Column, Integer, String, Float, Text, Index, select, delete, func, and_, or_, not_
+from config import settings
+from result_store import Base, ResultStore, result_store
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:/[a-z0-9]+)?")
+
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "with", "without", "is", "are", "was", "were",
+    "be", "do", "does", "did", "have", "has", "had", "there", "what", "which", "who", "whose", "how", "many",
+    "much", "me", "my", "our", "we", "you", "i", "it", "its", "this", "that", "these", "those", "about", "any",
+    "all", "show", "list", "tell", "give", "find", "please", "can", "could", "would", "should", "from", "by",
+    "at", "as", "not", "no", "number", "count", "total", "percent", "percentage", "share", "proportion", "ratio",
+    "provider", "providers", "doctor", "doctors", "record", "records", "row", "rows", "physician", "physicians",
+    "practitioner", "practitioners", "dataset", "data", "file", "upload", "npi", "npis", "status",
+}
+
+# Prefix length used to match inflections ("cardiologists" ~ "cardiology")
+STEM_PREFIX = 6
+
+
+def tokenize(text: str):
+    return TOKEN_PATTERN.findall(str(text or "").lower())
+
+
+def content_tokens(text: str):
+    return [t for t in tokenize(text) if t not in STOPWORDS and len(t) > 1]
+
+
+def same_stem(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    if len(a) >= STEM_PREFIX and len(b) >= STEM_PREFIX and a.isalpha() and b.isalpha():
+        return a[:STEM_PREFIX] == b[:STEM_PREFIX]
+    return False
+
+
+class ChatRecord(Base):
+    """
+    Compact, query-ready view of one task result (what the chat can filter and cite).
+    """
+    __tablename__ = "chat_records"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(String, nullable=False)
+    row_index = Column(Integer, nullable=False)
+    npi = Column(String)
+    provider_name = Column(String)
+    taxonomy = Column(String)
+    registry_status = Column(String)
+    npi_valid = Column(Integer)
+    validation_status = Column(String)
+    confidence_score = Column(Float)
+    issues = Column(Text)
+
+    __table_args__ = (Index("ix_chat_records_task_row", "task_id", "row_index"),)
+
+
+class ChatTerm(Base):
+    """
+    Inverted index: term -> rows of a task.
+    """
+    __tablename__ = "chat_terms"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(String, nullable=False)
+    term = Column(String, nullable=False)
+    row_index = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_chat_terms_task_term", "task_id", "term"),)
+
+
+def record_row(task_id: str, row_index: int, item: dict):
+    record = item.get("record", {})
+    val_res = item.get("api_data") or {}
+    enriched = item.get("enriched") or {}
+    issues = list(item.get("issues") or [])
+    if val_res.get("reason"):
+        issues.append(val_res["reason"])
+    specialties = enriched.get("specialties") if isinstance(enriched.get("specialties"), list) else []
+    return {
+        "task_id": task_id,
+        "row_index": row_index,
+        "npi": str(record.get("npi") or ""),
+        "provider_name": f"{record.get('first_name') or ''} {record.get('last_name') or ''}".strip(),
+        "taxonomy": val_res.get("primary_taxonomy") or "",
+        "registry_status": val_res.get("status"),
+        "npi_valid": 1 if val_res.get("valid") else 0,
+        "validation_status": item.get("validation_status"),
+        "confidence_score": item.get("confidence_score"),
+        "issues": "; ".join(issues),
+    }, specialties
+
+
+def describe(row) -> str:
+    status = {"A": "active", "D": "deactivated"}.get(row.registry_status, row.registry_status or "unknown")
+    parts = [
+        f"NPI {row.npi or '-'}", row.provider_name or "(no name)", row.taxonomy or "no taxonomy",
+        f"registry: {status}", f"{row.validation_status} ({row.confidence_score})",
+    ]
+    if row.issues:
+        parts.append(f"issues: {row.issues}")
+    return " | ".join(parts)
+
+
+class ChatIndex:
+    """
+    Per-task retrieval index for /chat, built once when the task completes: a compact record
+    table plus an inverted index over names, NPIs, taxonomies, specialties, statuses and issues.
+    Count/percentage questions are answered from it directly; other questions get only the
+    matching records as LLM context.
+    """
+    def __init__(self, store: ResultStore = None, context_records: int = None):
+        self.store = store or result_store
+        self.engine = self.store.engine
+        self.context_records = context_records or settings.CHAT_CONTEXT_RECORDS
+        Base.metadata.create_all(self.engine, tables=[ChatRecord.__table__, ChatTerm.__table__])
+
+    def clear(self, task_id: str):
+        with self.engine.begin() as conn:
+            conn.execute(delete(ChatRecord).where(ChatRecord.task_id == task_id))
+            conn.execute(delete(ChatTerm).where(ChatTerm.task_id == task_id))
+
+    def build(self, task_id: str, batch_size: int = 1000):
+        """
+        (Re)indexes all stored results of a task. Returns the number of indexed records.
+        """
+        self.clear(task_id)
+        records, terms = [], []
+        indexed = 0
+
+        def flush():
+            with self.engine.begin() as conn:
+                if records:
+                    conn.execute(ChatRecord.__table__.insert(), records)
+                if terms:
+                    conn.execute(ChatTerm.__table__.insert(), terms)
+            records.clear()
+            terms.clear()
+
+        for row_index, item in enumerate(self.store.iter_results(task_id, batch_size=batch_size)):
+            row, specialties = record_row(task_id, row_index, item)
+            records.append(row)
+            text = " ".join([
+                row["npi"], row["provider_name"], row["taxonomy"], row["validation_status"] or "",
+                row["issues"], " ".join(map(str, specialties)),
+            ])
+            for term in set(tokenize(text)):
+                terms.append({"task_id": task_id, "term": term, "row_index": row_index})
+            indexed += 1
+            if len(records) >= batch_size:
+                flush()
+        flush()
+        return indexed
+
+    def is_built(self, task_id: str) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(select(ChatRecord.id).where(ChatRecord.task_id == task_id).limit(1)).first() is not None
+
+    def _taxonomies(self, conn, task_id: str):
+        rows = conn.execute(
+            select(ChatRecord.taxonomy).where(ChatRecord.task_id == task_id, ChatRecord.taxonomy != "").distinct()
+        ).scalars().all()
+        return rows
+
+    def parse_filters(self, conn, task_id: str, question: str):
+        """
+        Maps the question onto record filters. Returns (conditions, labels, unmatched_tokens).
+        """
+        q = question.lower()
+        conditions, labels, used = [], [], set()
+
+        def add(condition, label, *words):
+            conditions.append(condition)
+            labels.append(label)
+            used.update(words)
+
+        if re.search(r"\b(inactive|deactivated|deactivation)\b", q):
+            add(and_(ChatRecord.registry_status.isnot(None), ChatRecord.registry_status != "A"),
+                "inactive in the registry", "inactive", "deactivated", "deactivation")
+        elif re.search(r"\bactive\b", q):
+            add(ChatRecord.registry_status == "A", "active in the registry", "active")
+
+        if re.search(r"\b(flagged|needs review|review)\b", q):
+            add(ChatRecord.validation_status == "Needs Review", "flagged for review", "flagged", "needs", "review")
+        elif re.search(r"\binvalid\b", q):
+            add(ChatRecord.npi_valid == 0, "with an invalid NPI/registration", "invalid")
+        elif re.search(r"\b(valid|verified)\b", q):
+            add(ChatRecord.validation_status == "Valid", "valid", "valid", "verified")
+
+        if re.search(r"\bmismatch", q):
+            add(ChatRecord.issues.like("%Name mismatch%"), "with a name mismatch", "name", "mismatch", "mismatched", "mismatches")
+        if re.search(r"\b(website|websites|unreachable)\b", q):
+            add(ChatRecord.issues.like("%Website unreachable%"), "with an unreachable website",
+                "website", "websites", "unreachable")
+        if re.search(r"\bnot found\b", q):
+            add(ChatRecord.issues.like("%not found%"), "not found in the registry", "found", "registry")
+
+        tokens = [t for t in content_tokens(q) if t not in used]
+        taxonomy_matches = []
+        for taxonomy in self._taxonomies(conn, task_id):
+            tax_tokens = content_tokens(taxonomy)
+            hits = {t for t in tokens if any(same_stem(t, x) for x in tax_tokens)}
+            if hits:
+                taxonomy_matches.append(taxonomy)
+                used.update(hits)
+        if taxonomy_matches:
+            conditions.append(ChatRecord.taxonomy.in_(taxonomy_matches))
+            labels.append("in " + " / ".join(taxonomy_matches))
+
+        unmatched = [t for t in tokens if t not in used]
+        return conditions, labels, unmatched
+
+    def aggregate(self, task_id: str, question: str):
+        """
+        Direct answer for count/percentage questions whose terms all map to filters; None otherwise.
+        """
+        q = question.lower()
+        wants_percent = bool(re.search(r"\b(percent|percentage|share|proportion|ratio|what fraction)\b|%", q))
+        wants_count = bool(re.search(r"\b(how many|number of|count|total)\b", q))
+        if not (wants_percent or wants_count):
+            return None
+
+        with self.engine.connect() as conn:
+            conditions, labels, unmatched = self.parse_filters(conn, task_id, question)
+            if unmatched:
+                return None
+            where = and_(ChatRecord.task_id == task_id, *conditions)
+            total = conn.execute(select(func.count()).select_from(ChatRecord).where(ChatRecord.task_id == task_id)).scalar()
+            matched = conn.execute(select(func.count()).select_from(ChatRecord).where(where)).scalar()
+            examples = conn.execute(
+                select(ChatRecord.provider_name, ChatRecord.npi).where(where).order_by(ChatRecord.row_index).limit(5)
+            ).all()
+
+        subject = "providers " + ", ".join(labels) if labels else "providers"
+        if wants_percent:
+            share = 100.0 * matched / total if total else 0.0
+            answer = f"{share:.1f}% of {total} records are {subject} ({matched} records)."
+        else:
+            answer = f"There are {matched} {subject} (out of {total} records)."
+        if examples and labels:
+            answer += " For example: " + ", ".join(f"{name or '(no name)'} (NPI {npi})" for name, npi in examples)
+            answer += "." if matched <= len(examples) else ", ..."
+        return answer
+
+    def retrieve(self, task_id: str, question: str, limit: int = None):
+        """
+        Records most relevant to the question: rows matching the most question terms (exact or same stem),
+        narrowed by any status filters in the question; flagged rows when nothing matches.
+        """
+        limit = limit or self.context_records
+        tokens = content_tokens(question)
+        with self.engine.connect() as conn:
+            conditions, _, _ = self.parse_filters(conn, task_id, question)
+            term_match = [ChatTerm.term == t for t in tokens]
+            term_match += [
+                and_(ChatTerm.term >= t[:STEM_PREFIX], ChatTerm.term < t[:STEM_PREFIX] + "\uffff")
+                for t in tokens if len(t) >= STEM_PREFIX and t.isalpha()
+            ]
+
+            rows = []
+            if term_match:
+                hits = (
+                    select(ChatTerm.row_index, func.count(func.distinct(ChatTerm.term)).label("hits"))
+                    .where(ChatTerm.task_id == task_id, or_(*term_match))
+                    .group_by(ChatTerm.row_index)
+                    .subquery()
+                )
+                rows = conn.execute(
+                    select(ChatRecord)
+                    .join(hits, hits.c.row_index == ChatRecord.row_index)
+                    .where(ChatRecord.task_id == task_id, *conditions)
+                    .order_by(hits.c.hits.desc(), ChatRecord.row_index)
+                    .limit(limit)
+                ).all()
+            if not rows:
+                fallback = conditions or [not_(ChatRecord.validation_status == "Valid")]
+                rows = conn.execute(
+                    select(ChatRecord).where(ChatRecord.task_id == task_id, *fallback)
+                    .order_by(ChatRecord.row_index).limit(limit)
+                ).all()
+        return [describe(r) for r in rows]
+
+
+chat_index = ChatIndex()
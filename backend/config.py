@@ -5,6 +5,113 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "AgenciAI"
     REDIS_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # Progress records: retention (seconds), push interval for the /task/{id}/events stream, and how long
+    # (seconds) the stream stays open without any change before it closes (clients reconnect)
+    PROGRESS_TTL: int = int(os.getenv("PROGRESS_TTL", str(24 * 3600)))
+    PROGRESS_PUSH_INTERVAL: float = float(os.getenv("PROGRESS_PUSH_INTERVAL", "0.5"))
+    PROGRESS_STREAM_IDLE_TIMEOUT: float = float(os.getenv("PROGRESS_STREAM_IDLE_TIMEOUT", "600"))
+
+    RESULT_STORE_URL: str = os.getenv("RESULT_STORE_URL", "sqlite:///./sql_app.db")
+    NPI_REGISTRY_URL: str = os.getenv("NPI_REGISTRY_URL", "https://npiregistry.cms.hhs.gov/api/")
+
+    # NPI validation: "index_first" serves lookups from the local NPPES index (built with
+    # `python -m agents.npi_index <nppes.csv>`) and only calls the registry for misses/stale entries; "api" always calls it
+    NPI_VALIDATION_MODE: str = os.getenv("NPI_VALIDATION_MODE", "index_first")
+    NPI_INDEX_PATH: str = os.getenv("NPI_INDEX_PATH", "./cache/npi_index.db")
+    NPI_INDEX_MAX_AGE_DAYS: int = int(os.getenv("NPI_INDEX_MAX_AGE_DAYS", "35"))
+
+    # Validation stage: worker threads per task and max requests/sec to any single host
+    VALIDATION_CONCURRENCY: int = int(os.getenv("VALIDATION_CONCURRENCY", "16"))
+    HOST_RATE_LIMIT: float = float(os.getenv("HOST_RATE_LIMIT", "20"))
+
+    # Shared HTTP client: keep-alive pool, retries on 429/5xx, per-host circuit breaker
+    HTTP_POOL_HOSTS: int = int(os.getenv("HTTP_POOL_HOSTS", "100"))
+    HTTP_POOL_PER_HOST: int = int(os.getenv("HTTP_POOL_PER_HOST", "16"))
+    HTTP_RETRIES: int = int(os.getenv("HTTP_RETRIES", "3"))
+    HTTP_BACKOFF: float = float(os.getenv("HTTP_BACKOFF", "0.5"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+    # Website checks: GET body cap when looking for a phone number, result cache TTL (s) and size,
+    # shorter TTL for timeouts (slow sites are retried sooner)
+    WEBSITE_TIMEOUT: float = float(os.getenv("WEBSITE_TIMEOUT", "5"))
+    WEBSITE_MAX_BYTES: int = int(os.getenv("WEBSITE_MAX_BYTES", str(256 * 1024)))
+    WEBSITE_CACHE_TTL: int = int(os.getenv("WEBSITE_CACHE_TTL", "3600"))
+    WEBSITE_TIMEOUT_TTL: int = int(os.getenv("WEBSITE_TIMEOUT_TTL", "60"))
+    WEBSITE_CACHE_SIZE: int = int(os.getenv("WEBSITE_CACHE_SIZE", "10000"))
+
+    # OCR: PDF rasterization DPI and page-level worker processes (each keeps a warm PaddleOCR model,
+    # ~1 GB apiece). The pool needs a non-daemonic worker process: run the OCR queue with --pool=threads or solo
+    OCR_DPI: int = int(os.getenv("OCR_DPI", "200"))
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # OCR text extraction: chunk size/overlap (chars) and concurrent LLM calls per document
+    EXTRACT_CHUNK_CHARS: int = int(os.getenv("EXTRACT_CHUNK_CHARS", "3000"))
+    EXTRACT_CHUNK_OVERLAP: int = int(os.getenv("EXTRACT_CHUNK_OVERLAP", "300"))
+    EXTRACT_CONCURRENCY: int = int(os.getenv("EXTRACT_CONCURRENCY", "4"))
+
+    # Agents created and warmed when a worker process starts, comma-separated ("" disables warm-up).
+    # OCR (~1 GB per model) is left out: only the OCR worker adds it (see docker-compose.yml).
+    # A plain string on purpose: pydantic-settings JSON-decodes list/dict fields read from the environment
+    AGENT_WARMUP: str = os.getenv("AGENT_WARMUP", "llm,validator,enricher,qa")
+
+    # Uploads: storage directory, disk-write chunk size and rows parsed to validate a CSV
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "/app/uploads")
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    UPLOAD_VALIDATE_ROWS: int = int(os.getenv("UPLOAD_VALIDATE_ROWS", "100"))
+
+    # CSV ingestion: rows parsed and validated per chunk (bounds worker memory)
+    CSV_CHUNK_SIZE: int = int(os.getenv("CSV_CHUNK_SIZE", "500"))
+
+    # LLM response cache: "disk" (SQLite file), "redis" or "off"; LRU-evicted past the size bounds
+    LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "disk")
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "./cache/llm_cache.db")
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+
+    # Incremental uploads: rows unchanged since a validation younger than this reuse its result
+    INCREMENTAL_VALIDATION: bool = os.getenv("INCREMENTAL_VALIDATION", "true").lower() == "true"
+    REVALIDATE_AFTER_DAYS: float = float(os.getenv("REVALIDATE_AFTER_DAYS", "7"))
+
+    # Chat: indexed records passed to the LLM as context per question
+    CHAT_CONTEXT_RECORDS: int = int(os.getenv("CHAT_CONTEXT_RECORDS", "20"))
+
+    # LLM call metrics: number of recent calls kept for percentiles
+    LLM_METRICS_RECENT: int = int(os.getenv("LLM_METRICS_RECENT", "500"))
+
+    # Pipeline metrics: seconds between buffered flushes to Redis; per-task profiles (?profile=true) go here
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "./cache/profiles")
+
+    # Learned CSV header mappings, keyed by header-set fingerprint
+    COLUMN_MAP_REGISTRY_PATH: str = os.getenv("COLUMN_MAP_REGISTRY_PATH", "./cache/column_mappings.json")
+
+    # LLM enrichment: providers packed per prompt and batches in flight against Ollama
+    ENRICH_BATCH_SIZE: int = int(os.getenv("ENRICH_BATCH_SIZE", "10"))
+    ENRICH_CONCURRENCY: int = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+
+    # Job routing: CSVs within both limits run on the "interactive" queue, larger ones on "bulk", PDFs/images on "ocr"
+    INTERACTIVE_MAX_ROWS: int = int(os.getenv("INTERACTIVE_MAX_ROWS", "1000"))
+    INTERACTIVE_MAX_BYTES: int = int(os.getenv("INTERACTIVE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+    # Per-tenant fairness (X-Tenant-ID, else the client address): jobs per class a tenant may run at once
+    # ("bulk=0" = unlimited; "chunk" caps the tenant's fan-out chunks in flight), requeue delay (s) while at
+    # the limit, and expiry of slots held by crashed workers (running jobs push it back as they report progress)
+    TENANT_JOB_LIMITS: str = os.getenv("TENANT_JOB_LIMITS", "interactive=4,bulk=2,ocr=1,chunk=8")
+    TENANT_RETRY_DELAY: float = float(os.getenv("TENANT_RETRY_DELAY", "5"))
+    TENANT_SLOT_TTL: int = int(os.getenv("TENANT_SLOT_TTL", str(6 * 3600)))
+
+    # Fan-out mode: split large uploads into chunk subtasks spread across all workers
+    # (chunks read their slice from the upload file, so every worker needs the shared UPLOAD_DIR)
+    FANOUT_ENABLED: bool = os.getenv("FANOUT_ENABLED", "false").lower() == "true"
+    FANOUT_CHUNK_SIZE: int = int(os.getenv("FANOUT_CHUNK_SIZE", "1000"))
+
+    # NPI registry lookup cache (in-process LRU in front of Redis). TTLs in seconds.
+    NPI_CACHE_REDIS_URL: str = os.getenv("NPI_CACHE_REDIS_URL", os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"))
+    NPI_CACHE_TTL: int = int(os.getenv("NPI_CACHE_TTL", str(7 * 24 * 3600)))
+    NPI_CACHE_NEGATIVE_TTL: int = int(os.getenv("NPI_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+    NPI_CACHE_LOCAL_SIZE: int = int(os.getenv("NPI_CACHE_LOCAL_SIZE", "10000"))
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+import zlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = [
+    "Original NPI",
+    "Original Name",
+    "Validation Status",
+    "Confidence Score",
+    "Issues",
+    "Registered Name",
+    "Taxonomy",
+    "Enriched Specialties",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def flatten_result(item):
+    """
+    Flattens one stored result into the export row layout.
+    """
+    record = item.get('record', {})
+    api_data = item.get('api_data', {})
+    enriched = item.get('enriched', {})
+
+    return {
+        "Original NPI": record.get('npi'),
+        "Original Name": f"{record.get('first_name')} {record.get('last_name')}",
+        "Validation Status": item.get('validation_status'),
+        "Confidence Score": item.get('confidence_score'),
+        "Issues": ", ".join(item.get('issues', [])),
+        "Registered Name": f"{api_data.get('first_name', '')} {api_data.get('last_name', '')}",
+        "Taxonomy": api_data.get('primary_taxonomy'),
+        "Enriched Specialties": ", ".join(enriched.get('specialties', [])) if isinstance(enriched, dict) else ""
+    }
+
+
+def _batched_rows(results, columns, batch_size):
+    batch = []
+    for item in results:
+        row = flatten_result(item)
+        batch.append({c: row.get(c) for c in columns})
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(results, columns, batch_size: int = 500):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for batch in _batched_rows(results, columns, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(results, columns, batch_size: int = 500):
+    for batch in _batched_rows(results, columns, batch_size):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+
+class _DrainableSink(io.RawIOBase):
+    """
+    Write-only file object that hands written bytes back to the caller instead of keeping them.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(results, columns, batch_size: int = 5000):
+    """
+    Writes one Parquet row group per batch and yields its bytes as soon as it is flushed.
+    """
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    schema = pa.schema([
+        (c, pa.float64() if c == "Confidence Score" else pa.string()) for c in columns
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _batched_rows(results, columns, batch_size):
+            table = pa.Table.from_pylist(batch, schema=schema)
+            writer.write_table(table)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks):
+    """
+    Gzip-compresses a stream of str/bytes chunks on the fly.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(results, fmt: str = "csv", columns=None, gzip: bool = False):
+    """
+    Returns an iterator over the encoded export of `results` (an iterator of stored results).
+    """
+    columns = columns or EXPORT_COLUMNS
+    if fmt == "csv":
+        stream = iter_csv(results, columns)
+    elif fmt == "ndjson":
+        stream = iter_ndjson(results, columns)
+    elif fmt == "parquet":
+        stream = iter_parquet(results, columns)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return gzip_stream(stream) if gzip else stream
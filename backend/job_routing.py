@@ -0,0 +1,170 @@
+import math
+import re
+import time
+from config import settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Job classes double as Celery queue names; each gets its own worker pool (see docker-compose.yml)
+JOB_CLASSES = ("interactive", "bulk", "ocr")
+
+# Redis transport priorities: 0 is served first, 9 last
+PRIORITY_STEPS = list(range(10))
+
+
+def tenant_id(value: str = None, client: str = None) -> str:
+    """
+    Tenant from the X-Tenant-ID header, reduced to a safe Redis key part. Without the header each
+    client address is its own tenant, so anonymous callers never share one set of limits.
+    """
+    value = re.sub(r"[^A-Za-z0-9_.-]", "", str(value or ""))[:64]
+    if not value and client:
+        value = "client-" + re.sub(r"[^A-Za-z0-9_.-]", "_", str(client))[:64]
+    return value or "default"
+
+
+def parse_limits(spec: str):
+    """
+    "interactive=4,bulk=2,ocr=1,chunk=8" -> {"interactive": 4, "bulk": 2, "ocr": 1, "chunk": 8}
+    """
+    limits = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+def choose_route(input_type: str, size_bytes: int, rows: int = None):
+    """
+    Picks job class, queue and priority for an upload. PDFs/images go to the OCR pool; CSVs within
+    the interactive limits go to the interactive pool; larger CSVs go to bulk, smaller ones first.
+    """
+    if input_type != "csv":
+        return {"job_class": "ocr", "queue": "ocr", "priority": 5}
+    if rows is not None and rows <= settings.INTERACTIVE_MAX_ROWS and size_bytes <= settings.INTERACTIVE_MAX_BYTES:
+        return {"job_class": "interactive", "queue": "interactive", "priority": 0}
+    rows = rows if rows is not None else size_bytes // 100
+    return {"job_class": "bulk", "queue": "bulk", "priority": bulk_priority(rows)}
+
+
+def bulk_priority(rows: int) -> int:
+    """
+    Bulk queue priority by job size: 5 for small jobs up to 9 for the largest, never ahead of interactive work.
+    """
+    return min(9, max(5, int(math.log10(max(rows, 1))) + 3))
+
+
+class TenantLimiter:
+    """
+    Per-tenant counting semaphore in Redis: a sorted set of running job ids per tenant and job class,
+    scored by expiry so slots held by crashed workers free themselves after TENANT_SLOT_TTL.
+    """
+    def __init__(self, redis_url: str = None, limits: dict = None, slot_ttl: int = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.limits = limits if limits is not None else parse_limits(settings.TENANT_JOB_LIMITS)
+        self.slot_ttl = slot_ttl or settings.TENANT_SLOT_TTL
+        self.prefix = "tenant:"
+        self._redis = None
+        self._refreshed = {}
+
+    def _client(self):
+        if self._redis is None and redis:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2, decode_responses=True)
+        return self._redis
+
+    def limit(self, job_class: str) -> int:
+        return self.limits.get(job_class, 0)
+
+    def acquire(self, tenant: str, job_class: str, job_id: str) -> bool:
+        """
+        Takes a slot for the job (idempotent for a job that already holds one). False when the tenant is at its limit.
+        """
+        limit = self.limit(job_class)
+        if limit <= 0:
+            return True
+        key = f"{self.prefix}{tenant}:{job_class}"
+
+        def take(pipe):
+            now = time.time()
+            pipe.zremrangebyscore(key, "-inf", now)
+            held = pipe.zscore(key, job_id) is not None
+            if not held and pipe.zcard(key) >= limit:
+                pipe.multi()
+                return False
+            pipe.multi()
+            pipe.zadd(key, {job_id: now + self.slot_ttl})
+            pipe.expire(key, self.slot_ttl)
+            pipe.set(f"{self.prefix}job:{job_id}", key, ex=self.slot_ttl)
+            return True
+
+        return self._client().transaction(take, key, value_from_callable=True)
+
+    def refresh(self, job_id: str, min_interval: float = 60):
+        """
+        Pushes a running job's slot expiry back to now + slot_ttl, so long jobs keep their slot while
+        only crashed ones lose it. Called from progress heartbeats; at most once per min_interval per process.
+        """
+        now = time.time()
+        if now - self._refreshed.get(job_id, 0) < min_interval:
+            return
+        if len(self._refreshed) > 1000:
+            # fan-out chunk workers never see the release of the jobs they helped with
+            self._refreshed = {j: t for j, t in self._refreshed.items() if now - t < min_interval}
+        self._refreshed[job_id] = now
+        client = self._client()
+        key = client.get(f"{self.prefix}job:{job_id}")
+        if key:
+            pipe = client.pipeline()
+            pipe.zadd(key, {job_id: now + self.slot_ttl}, xx=True)
+            pipe.expire(key, self.slot_ttl)
+            pipe.expire(f"{self.prefix}job:{job_id}", self.slot_ttl)
+            pipe.execute()
+
+    def release(self, job_id: str):
+        """
+        Frees the slot held by a job, if any.
+        """
+        client = self._client()
+        key = client.get(f"{self.prefix}job:{job_id}")
+        if key:
+            pipe = client.pipeline()
+            pipe.zrem(key, job_id)
+            pipe.delete(f"{self.prefix}job:{job_id}")
+            pipe.execute()
+        self._refreshed.pop(job_id, None)
+
+    def stats(self):
+        """
+        Running jobs per tenant and class, with the configured limits.
+        """
+        client = self._client()
+        now = time.time()
+        running = {}
+        for key in client.scan_iter(match=f"{self.prefix}*:*"):
+            if key.startswith(f"{self.prefix}job:"):
+                continue
+            tenant, _, job_class = key[len(self.prefix):].rpartition(":")
+            count = client.zcount(key, now, "+inf")
+            if count:
+                running.setdefault(tenant, {})[job_class] = count
+        return {"limits": self.limits, "running": running}
+
+
+def queue_depths(client):
+    """
+    Messages waiting per queue (Redis keeps one list per priority step: "<queue>", "<queue>:1", ...).
+    """
+    pipe = client.pipeline()
+    for queue in JOB_CLASSES:
+        for step in PRIORITY_STEPS:
+            pipe.llen(queue if step == 0 else f"{queue}:{step}")
+    lengths = pipe.execute()
+    steps = len(PRIORITY_STEPS)
+    return {queue: sum(lengths[i * steps:(i + 1) * steps]) for i, queue in enumerate(JOB_CLASSES)}
+
+
+tenant_limiter = TenantLimiter()
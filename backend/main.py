@@ -1,11 +1,15 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from config import settings
 from celery_worker import process_upload_task
+from result_store import result_store
+from progress import progress_tracker, TERMINAL_STATES
+from job_routing import choose_route, tenant_id, tenant_limiter, queue_depths
 import pandas as pd
-import io
 import shutil
+import time
 import uuid
 
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -22,44 +26,99 @@ app.add_middleware(
 def home():
     return {"message": "AgenciAI Backend Running"}
 
+# Accepted uploads: filename suffix -> pipeline input type
+UPLOAD_TYPES = {
+    ".csv": "csv", ".csv.gz": "csv", ".gz": "csv", ".zip": "csv",
+    ".pdf": "pdf", ".png": "pdf", ".jpg": "pdf", ".jpeg": "pdf",
+}
+
+def upload_suffix(filename: str):
+    """
+    Longest accepted suffix of the filename (".csv.gz" before ".gz"), or None.
+    """
+    name = (filename or "").lower()
+    for suffix in sorted(UPLOAD_TYPES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+def save_upload(source, save_path: str):
+    """
+    Copies the spooled upload to disk in fixed-size chunks (constant memory). Runs in a worker thread.
+    """
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    source.seek(0)
+    with open(save_path, "wb") as f:
+        shutil.copyfileobj(source, f, settings.UPLOAD_CHUNK_SIZE)
+
+def check_csv_header(save_path: str):
+    """
+    Cheap validation: the file decompresses and the first rows parse with at least one column.
+    Returns the estimated row count used for job routing.
+    """
+    from celery_worker import open_csv_text, estimate_csv_rows
+    with open_csv_text(save_path) as f:
+        head = pd.read_csv(f, nrows=settings.UPLOAD_VALIDATE_ROWS, dtype=str)
+    if len(head.columns) == 0:
+        raise ValueError("CSV has no header row")
+    return estimate_csv_rows(save_path)
+
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(request: Request, file: UploadFile = File(...), revalidate: bool = False, profile: bool = False,
+                      x_tenant_id: str = Header(None)):
     """
-    Accepts CSV or PDF/Image, saves it, and triggers the Agent Pipeline.
+    Accepts CSV (optionally .csv.gz / .zip) or PDF/Image, saves it, and triggers the Agent Pipeline.
+    File I/O and header parsing run in the threadpool so large uploads never block the event loop.
+    The job is routed by type, size and estimated rows to the interactive, bulk or OCR queue and
+    counts against the X-Tenant-ID tenant's concurrency limits (the client address's without the header).
+    revalidate=true re-runs every row instead of reusing results of unchanged rows;
+    profile=true captures a profile of the run (see /task/{task_id}/profile).
     """
+    suffix = upload_suffix(file.filename)
+    if suffix is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    input_type = UPLOAD_TYPES[suffix]
+    file_id = str(uuid.uuid4())
+    save_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{suffix}")
+
+    rows = None
     try:
-        content = await file.read()
-        file_ext = file.filename.split('.')[-1].lower()
-        file_id = str(uuid.uuid4())
-        
-        input_type = "csv"
-        
-        # Save to disk
-        os.makedirs("/app/uploads", exist_ok=True)
-        save_path = f"/app/uploads/{file_id}.{file_ext}"
-        
-        with open(save_path, "wb") as f:
-            f.write(content)
-            
-        if file_ext in ['pdf', 'png', 'jpg', 'jpeg']:
-            input_type = "pdf"
-        elif file_ext == 'csv':
-             # Validate CSV simple read
-             pd.read_csv(io.BytesIO(content))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-            
-        # Trigger Celery Task
-        task = process_upload_task.delay(save_path, input_type)
-        
-        return {
-            "message": "Upload successful", 
-            "file_id": file_id,
-            "task_id": task.id,
-            "type": input_type
-        }
+        await run_in_threadpool(save_upload, file.file, save_path)
+        if input_type == "csv":
+            rows = await run_in_threadpool(check_csv_header, save_path)
     except Exception as e:
+        if os.path.exists(save_path):
+            os.remove(save_path)
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+
+    # Trigger Celery Task; the progress record exists from enqueue on, so streams can tell queued from unknown ids
+    route = choose_route(input_type, os.path.getsize(save_path), rows)
+    task_id = str(uuid.uuid4())
+    progress_tracker.update(task_id, state='PENDING', step='Queued')
+    task = process_upload_task.apply_async(
+        args=(save_path, input_type),
+        task_id=task_id,
+        kwargs={
+            "incremental": False if revalidate else None,
+            "profile": profile,
+            "tenant": tenant_id(x_tenant_id, request.client.host if request.client else None),
+            "job_class": route["job_class"],
+            "queued_at": time.time(),
+        },
+        queue=route["queue"],
+        priority=route["priority"],
+    )
+
+    return {
+        "message": "Upload successful",
+        "file_id": file_id,
+        "task_id": task.id,
+        "type": input_type,
+        "job_class": route["job_class"],
+        "estimated_rows": rows
+    }
 
 @app.get("/task/{task_id}")
 def get_task_status(task_id: str):
@@ -73,86 +132,213 @@ def get_task_status(task_id: str):
         "result": result.result
     }
 
+def read_progress(task_id: str):
+    """
+    Compact progress snapshot; falls back to the bare Celery state for tasks without a record.
+    """
+    progress = progress_tracker.get(task_id)
+    if progress is None:
+        from celery.result import AsyncResult
+        from celery_worker import celery_app
+        progress = {"task_id": task_id, "state": AsyncResult(task_id, app=celery_app).state}
+    return progress
+
+@app.get("/task/{task_id}/progress")
+def get_task_progress(task_id: str):
+    """
+    Lightweight status for polling: state, step and counters only, never the results.
+    """
+    return read_progress(task_id)
+
+@app.get("/task/{task_id}/timings")
+def get_task_timings(task_id: str):
+    """
+    Seconds and call counts per pipeline stage, summed over all workers that ran the task.
+    """
+    from metrics import metrics
+    return {"task_id": task_id, "timings": metrics.task_timings(task_id)}
+
+@app.get("/task/{task_id}/profile")
+def get_task_profile(task_id: str, format: str = "txt"):
+    """
+    Profile captured by an upload with profile=true (format=html needs pyinstrument).
+    """
+    from fastapi.responses import FileResponse
+    from metrics import profile_path
+    if format not in ("txt", "html"):
+        raise HTTPException(status_code=400, detail="format must be txt or html")
+    path = profile_path(task_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No profile for this task")
+    return FileResponse(path, media_type="text/html" if format == "html" else "text/plain")
+
+@app.get("/task/{task_id}/events")
+async def stream_task_progress(task_id: str):
+    """
+    Server-Sent Events push variant of /task/{task_id}/progress.
+    Emits a snapshot whenever it changes and closes once the task reaches a terminal state, when the
+    task id is unknown, or after PROGRESS_STREAM_IDLE_TIMEOUT seconds without a change.
+    """
+    import asyncio
+    import json
+    from fastapi.responses import StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+
+    async def event_stream():
+        last = None
+        idle = 0.0
+        unchanged = 0.0
+        while True:
+            progress = await run_in_threadpool(read_progress, task_id)
+            if progress != last:
+                yield f"data: {json.dumps(progress)}\n\n"
+                last = progress
+                idle = unchanged = 0.0
+            elif idle >= 15:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            if progress.get("state") in TERMINAL_STATES:
+                break
+            # No progress record and nothing in the result backend: the id was never enqueued
+            if "updated_at" not in progress and progress.get("state") == "PENDING":
+                break
+            if unchanged >= settings.PROGRESS_STREAM_IDLE_TIMEOUT:
+                break
+            await asyncio.sleep(settings.PROGRESS_PUSH_INTERVAL)
+            idle += settings.PROGRESS_PUSH_INTERVAL
+            unchanged += settings.PROGRESS_PUSH_INTERVAL
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/results/{task_id}")
+def get_task_results(task_id: str, offset: int = 0, limit: int = 100):
+    """
+    Pages through the stored results of a completed task.
+    """
+    limit = max(1, min(limit, 1000))
+    return {
+        "task_id": task_id,
+        "total": result_store.count(task_id),
+        "offset": offset,
+        "limit": limit,
+        "data": result_store.get_results(task_id, offset=offset, limit=limit)
+    }
+
+@app.get("/report/{task_id}")
+def get_task_report(task_id: str):
+    """
+    Full directory report (including every action item) of a completed task.
+    """
+    report = result_store.get_report(task_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No report found")
+    return report
+
 @app.get("/download/{task_id}")
-def download_results(task_id: str):
+def download_results(task_id: str, format: str = "csv", columns: str = None, status: str = None, gzip: bool = False):
     """
-    Generates a CSV from the validation results.
+    Streams the validation results row by row from the result store.
+    format: csv | ndjson | parquet
+    columns: comma-separated subset of the export columns
+    status: only rows with this validation status (e.g. "Needs Review")
+    gzip: compress on the fly
     """
     from celery.result import AsyncResult
     from celery_worker import celery_app
     from fastapi.responses import StreamingResponse
-    import csv
+    from exporter import EXPORT_COLUMNS, MEDIA_TYPES, export_stream, pa
     
     result = AsyncResult(task_id, app=celery_app)
     if result.status != 'SUCCESS':
          raise HTTPException(status_code=400, detail="Task not completed")
          
-    data = result.result.get('data', [])
-    if not data:
+    if not result_store.count(task_id):
         raise HTTPException(status_code=404, detail="No data found")
-        
-    # Flatten data for CSV
-    flat_data = []
-    for item in data:
-        record = item.get('record', {})
-        api_data = item.get('api_data', {})
-        enriched = item.get('enriched', {})
-        
-        row = {
-            "Original NPI": record.get('npi'),
-            "Original Name": f"{record.get('first_name')} {record.get('last_name')}",
-            "Validation Status": item.get('validation_status'),
-            "Confidence Score": item.get('confidence_score'),
-            "Issues": ", ".join(item.get('issues', [])),
-            "Registered Name": f"{api_data.get('first_name', '')} {api_data.get('last_name', '')}",
-            "Taxonomy": item.get('api_data', {}).get('primary_taxonomy'),
-            "Enriched Specialties": ", ".join(enriched.get('specialties', [])) if enriched else ""
-        }
-        flat_data.append(row)
-        
-    stream = io.StringIO()
-    writer = csv.DictWriter(stream, fieldnames=flat_data[0].keys())
-    writer.writeheader()
-    writer.writerows(flat_data)
-    stream.seek(0)
+
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(MEDIA_TYPES)}")
+    if format == "parquet" and pa is None:
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+
+    selected = EXPORT_COLUMNS
+    if columns:
+        selected = [c.strip() for c in columns.split(",") if c.strip()]
+        unknown = [c for c in selected if c not in EXPORT_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {unknown}")
+
+    rows = result_store.iter_results(task_id, status=status)
+    filename = f"validated_providers.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else MEDIA_TYPES[format]
     
-    response = StreamingResponse(iter([stream.getvalue()]), media_type="text/csv")
-    response.headers["Content-Disposition"] = "attachment; filename=validated_providers.csv"
+    response = StreamingResponse(export_stream(rows, format, selected, gzip=gzip), media_type=media_type)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
     return response
 
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Cache hit/miss counters: NPI registry lookups (registry calls saved) and LLM responses.
+    """
+    from agents.npi_cache import npi_cache
+    from agents.llm_cache import llm_cache
+    from agents.npi_index import npi_index
+    stats = npi_cache.stats()
+    stats["llm"] = llm_cache.stats()
+    stats["npi_index"] = npi_index.stats()
+    return stats
+
+@app.get("/queues/stats")
+def queue_stats():
+    """
+    Waiting jobs per queue and running jobs per tenant and job class.
+    """
+    return {"queued": queue_depths(tenant_limiter._client()), "tenants": tenant_limiter.stats()}
+
+@app.get("/agents/stats")
+def agent_stats():
+    """
+    Worker warm-up metrics: how often each agent/model was loaded and how long it took.
+    """
+    from agent_registry import agent_registry
+    return agent_registry.stats()
+
 class ChatRequest(BaseModel):
     task_id: str
     message: str
 
-@app.post("/chat")
-def chat_with_data(req: ChatRequest):
+def build_chat_prompt(req: ChatRequest):
     """
-    Simple RAG: Fetches task context and answers user question.
+    Query-aware RAG over the task's chat index. Returns (prompt, None), or (None, reply) when the
+    question is answered without the LLM (task not finished yet, or a count/percentage question).
     """
-    from celery.result import AsyncResult
-    from celery_worker import celery_app
-    from agents.llm_client import LLMClient
-    
-    result = AsyncResult(req.task_id, app=celery_app)
-    if result.status != 'SUCCESS':
-         return {"response": "I can only answer questions once the data analysis is complete."}
-         
-    data = result.result.get('data', [])
-    report = result.result.get('report', {})
+    from chat_index import chat_index
+
+    report = result_store.get_report(req.task_id)
+    if report is None:
+         return None, "I can only answer questions once the data analysis is complete."
+    if not chat_index.is_built(req.task_id):
+        chat_index.build(req.task_id)
+
+    direct = chat_index.aggregate(req.task_id, req.message)
+    if direct:
+        return None, direct
+
+    relevant = chat_index.retrieve(req.task_id, req.message)
+    relevant_text = "\n".join(relevant)
     
-    # Create context (summarized to fit context window)
+    # Create context (summary plus only the records relevant to this question)
     context = f"""
     Dataset Summary:
-    Total Records: {len(data)}
+    Total Records: {report.get('total_processed')}
     Valid Providers: {report.get('valid_providers')}
     Flagged: {report.get('flagged_providers')}
     Accuracy: {report.get('accuracy_rate')}
     
-    Sample Issues Found:
-    {[d['issues'] for d in data if d['issues']][:5]}
+    Relevant Records:
+    {relevant_text}
     """
     
-    llm = LLMClient()
     prompt = f"""
     Context: {context}
     
@@ -160,8 +346,60 @@ def chat_with_data(req: ChatRequest):
     
     Answer as a helpful data assistant.
     """
-    
-    response = llm.generate(prompt, system_prompt="You are AgenciAI, a provider data specialist.")
+    return prompt, None
+
+CHAT_SYSTEM_PROMPT = "You are AgenciAI, a provider data specialist."
+
+@app.post("/chat")
+def chat_with_data(req: ChatRequest):
+    """
+    Simple RAG: Fetches task context and answers user question.
+    """
+    from agents.llm_client import LLMClient
+
+    prompt, reply = build_chat_prompt(req)
+    if reply:
+        return {"response": reply}
+
+    llm = LLMClient()
+    response = llm.generate(prompt, system_prompt=CHAT_SYSTEM_PROMPT)
     return {"response": response}
+
+@app.post("/chat/stream")
+def chat_with_data_stream(req: ChatRequest):
+    """
+    Same answer as /chat, streamed as plain text while the model generates it.
+    """
+    from fastapi.responses import StreamingResponse
+    from agents.llm_client import LLMClient
+
+    prompt, reply = build_chat_prompt(req)
+    if reply:
+        return StreamingResponse(iter([reply]), media_type="text/plain; charset=utf-8")
+
+    llm = LLMClient()
+    return StreamingResponse(
+        llm.generate_stream(prompt, system_prompt=CHAT_SYSTEM_PROMPT),
+        media_type="text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/llm/metrics")
+def llm_call_metrics():
+    """
+    LLM timing for dashboards: time-to-first-token, tokens/sec and token counts per call type,
+    plus percentiles over recent calls.
+    """
+    from agents.llm_metrics import llm_metrics
+    return llm_metrics.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: stage/request latency histograms and cache, lookup, row and error counters.
+    """
+    from fastapi.responses import PlainTextResponse
+    from metrics import metrics
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
     
 import os
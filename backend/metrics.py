@@ -0,0 +1,261 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from config import settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# name -> (type, help); only registered families are exported
+FAMILIES = {
+    "agenciai_stage_seconds": ("histogram", "Time spent per pipeline stage (per chunk for chunked stages)."),
+    "agenciai_row_validation_seconds": ("histogram", "Per-row validation latency (registry lookup + website check)."),
+    "agenciai_queue_wait_seconds": ("histogram", "Time upload jobs waited before starting, by job class (includes tenant-limit requeues)."),
+    "agenciai_registry_request_seconds": ("histogram", "NPI registry API request latency."),
+    "agenciai_website_check_seconds": ("histogram", "Provider website check latency."),
+    "agenciai_llm_request_seconds": ("histogram", "Ollama generate call latency."),
+    "agenciai_ocr_page_seconds": ("histogram", "OCR time per page."),
+    "agenciai_npi_lookups_total": ("counter", "NPI validations by answer source."),
+    "agenciai_registry_calls_total": ("counter", "NPI registry API calls by outcome."),
+    "agenciai_cache_requests_total": ("counter", "Cache lookups by cache and result."),
+    "agenciai_llm_tokens_total": ("counter", "LLM tokens processed (prompt / eval)."),
+    "agenciai_rows_total": ("counter", "Processed rows by outcome."),
+    "agenciai_errors_total": ("counter", "Errors by stage and reason."),
+    "agenciai_tasks_total": ("counter", "Upload tasks by final state."),
+}
+
+
+def error_reason(reason: str) -> str:
+    """
+    Low-cardinality label for an error message: drops parenthesised details and anything after ':'.
+    """
+    reason = re.sub(r"\s*\(.*?\)", "", str(reason or "unknown"))
+    return reason.split(":")[0].strip()[:80] or "unknown"
+
+
+def label_value(value) -> str:
+    """
+    Escapes a label value for the text exposition format (backslash, double quote, newline);
+    tabs become spaces since they separate histogram fields in the stored hash.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", " ")
+
+
+def label_string(labels: dict) -> str:
+    return ",".join(f'{k}="{label_value(v)}"' for k, v in sorted(labels.items()))
+
+
+class Metrics:
+    """
+    Prometheus-style counters and histograms shared by API and workers through Redis.
+    Updates are buffered in-process and flushed in one pipeline every METRICS_FLUSH_INTERVAL
+    seconds (and at the end of each batch), so per-call instrumentation costs no round trips.
+    Stage timings are also summed per task into metrics:task:<id>.
+    """
+    def __init__(self, redis_url: str = None, flush_interval: float = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.flush_interval = settings.METRICS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.prefix = "metrics:"
+        self._pending = {}  # (redis key, field) -> amount
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None and redis:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2, decode_responses=True)
+        return self._redis
+
+    def _add(self, key: str, field: str, amount: float):
+        with self._lock:
+            self._pending[(key, field)] = self._pending.get((key, field), 0) + amount
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        if amount:
+            self._add(self.prefix + name, label_string(labels), amount)
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self.prefix + name
+        labels_str = label_string(labels)
+        for bucket in BUCKETS:
+            if seconds <= bucket:
+                self._add(key, f"{labels_str}\tbucket\t{bucket}", 1)
+        self._add(key, f"{labels_str}\tbucket\t+Inf", 1)
+        self._add(key, f"{labels_str}\tsum", seconds)
+        self._add(key, f"{labels_str}\tcount", 1)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def stage(self, stage: str, task_id: str = None):
+        """
+        Times a pipeline stage into the stage histogram and the task's timing breakdown.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("agenciai_stage_seconds", elapsed, stage=stage)
+            if task_id:
+                self._add(f"{self.prefix}task:{task_id}", stage, elapsed)
+                self._add(f"{self.prefix}task:{task_id}", f"{stage}:calls", 1)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            client = self._client()
+            if not client:
+                return
+            pipe = client.pipeline(transaction=False)
+            task_keys = set()
+            for (key, field), amount in pending.items():
+                if isinstance(amount, int):
+                    pipe.hincrby(key, field, amount)
+                else:
+                    pipe.hincrbyfloat(key, field, amount)
+                if key.startswith(self.prefix + "task:"):
+                    task_keys.add(key)
+            for key in task_keys:
+                pipe.expire(key, settings.PROGRESS_TTL)
+            pipe.execute()
+        except Exception as e:
+            print(f"Warning: could not flush metrics: {e}")
+
+    def _read(self, key: str):
+        """
+        One stored hash, or {} when Redis is unavailable (reads never fail the caller).
+        """
+        try:
+            return self._client().hgetall(key)
+        except Exception as e:
+            print(f"Warning: could not read metrics: {e}")
+            return {}
+
+    def task_timings(self, task_id: str):
+        """
+        Per-task breakdown: {stage: {"seconds", "calls"}} summed over every worker that ran part of the task.
+        """
+        self.flush()
+        raw = self._read(f"{self.prefix}task:{task_id}")
+        timings = {}
+        for field, value in raw.items():
+            stage, _, kind = field.partition(":")
+            entry = timings.setdefault(stage, {"seconds": 0.0, "calls": 0})
+            if kind == "calls":
+                entry["calls"] = int(float(value))
+            else:
+                entry["seconds"] = round(float(value), 4)
+        return timings
+
+    def counter(self, name: str):
+        """
+        One counter family: {label string: value}.
+        """
+        self.flush()
+        return {labels: float(value) for labels, value in self._read(self.prefix + name).items()}
+
+    def render(self):
+        """
+        Prometheus text exposition of every registered family (families without samples when Redis is unavailable).
+        """
+        self.flush()
+        try:
+            pipe = self._client().pipeline(transaction=False)
+            for name in FAMILIES:
+                pipe.hgetall(self.prefix + name)
+            values = pipe.execute()
+        except Exception as e:
+            print(f"Warning: could not read metrics: {e}")
+            values = [{} for _ in FAMILIES]
+
+        lines = []
+        for (name, (kind, help_text)), fields in zip(FAMILIES.items(), values):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in sorted(fields.items()):
+                    lines.append(f"{name}{{{labels}}} {float(value):g}" if labels else f"{name} {float(value):g}")
+                continue
+
+            series = {}
+            for field, value in fields.items():
+                labels, _, rest = field.partition("\t")
+                series.setdefault(labels, {})[rest] = float(value)
+            for labels, data in sorted(series.items()):
+                sep = "," if labels else ""
+                for bucket in [*BUCKETS, "+Inf"]:
+                    count = data.get(f"bucket\t{bucket}", 0)
+                    lines.append(f'{name}_bucket{{{labels}{sep}le="{bucket}"}} {count:g}')
+                lines.append(f"{name}_sum{{{labels}}} {data.get('sum', 0):g}")
+                lines.append(f"{name}_count{{{labels}}} {data.get('count', 0):g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def profiled(task_id: str):
+    """
+    Captures a profile of one task run: pyinstrument (text + HTML) when installed, else cProfile
+    (.prof for snakeviz/pstats + a text summary of the top functions), saved under PROFILE_DIR.
+    """
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(settings.PROFILE_DIR, task_id)
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                f.write(profiler.output_text(unicode=True))
+            with open(f"{base}.html", "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        return
+
+    import cProfile
+    import io
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{base}.prof")
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+
+
+def profile_path(task_id: str, ext: str = "txt"):
+    path = os.path.join(settings.PROFILE_DIR, f"{os.path.basename(task_id)}.{ext}")
+    return path if os.path.exists(path) else None
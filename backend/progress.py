@@ -0,0 +1,83 @@
+import time
+from config import settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+
+class ProgressTracker:
+    """
+    Compact per-task progress record (a small Redis hash), written by workers and read by the API.
+    Polling it never touches the Celery result backend or the stored results.
+    """
+    def __init__(self, redis_url: str = None, ttl: int = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.ttl = ttl if ttl is not None else settings.PROGRESS_TTL
+        self.prefix = "progress:"
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None and redis:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2, decode_responses=True)
+        return self._redis
+
+    def start(self, task_id: str, step: str, total: int = 0):
+        key = self.prefix + task_id
+        client = self._client()
+        pipe = client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={
+            "state": "STARTED", "step": step, "current": 0, "total": total,
+            "valid": 0, "flagged": 0, "skipped": 0, "updated_at": time.time()
+        })
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def update(self, task_id: str, **fields):
+        """
+        Sets fields (state, step, total, provider, ...) on the record.
+        """
+        key = self.prefix + task_id
+        fields["updated_at"] = time.time()
+        mapping = {k: v for k, v in fields.items() if v is not None}
+        client = self._client()
+        pipe = client.pipeline()
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def incr(self, task_id: str, current: int = 0, valid: int = 0, flagged: int = 0, skipped: int = 0, **fields):
+        """
+        Atomically bumps counters (and optionally sets fields) in one round trip;
+        safe for fan-out chunks running on several workers.
+        """
+        key = self.prefix + task_id
+        client = self._client()
+        pipe = client.pipeline()
+        for name, amount in (("current", current), ("valid", valid), ("flagged", flagged), ("skipped", skipped)):
+            if amount:
+                pipe.hincrby(key, name, amount)
+        fields["updated_at"] = time.time()
+        pipe.hset(key, mapping={k: v for k, v in fields.items() if v is not None})
+        pipe.execute()
+
+    def get(self, task_id: str):
+        raw = self._client().hgetall(self.prefix + task_id)
+        if not raw:
+            return None
+        progress = {"task_id": task_id}
+        for k, v in raw.items():
+            if k in ("current", "total", "valid", "flagged", "skipped"):
+                progress[k] = int(v)
+            elif k == "updated_at":
+                progress[k] = float(v)
+            else:
+                progress[k] = v
+        return progress
+
+
+progress_tracker = ProgressTracker()
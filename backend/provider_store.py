@@ -0,0 +1,128 @@
+import hashlib
+import json
+import re
+import time
+from sqlalchemy import Column, String, Float, Text, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from config import settings
+from result_store import Base, ResultStore, result_store
+
+# Input fields that decide whether a row changed since it was last validated
+HASHED_FIELDS = ("npi", "first_name", "last_name", "website")
+
+# Failures that say nothing about the provider (network or upstream trouble): such rows are revalidated next time
+TRANSIENT_REASON = re.compile(
+    r"^(Connection Error|Registry unavailable|API Error (429|5\d\d)|Validation Error|Scraping Error"
+    r"|Website unreachable \(Status (429|5\d\d)\))"
+)
+
+
+def provider_identity(record: dict):
+    """
+    Normalized NPI / registration number ("" -> None: such rows are never reused).
+    """
+    value = str(record.get("npi") or "").strip().upper().replace(" ", "")
+    return value or None
+
+
+def content_hash(record: dict) -> str:
+    values = [str(record.get(field) or "").strip().lower() for field in HASHED_FIELDS]
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def is_definitive(result: dict) -> bool:
+    """
+    False when registry validation, the website check or LLM enrichment failed transiently.
+    """
+    for part in ("api_data", "website_validation"):
+        if TRANSIENT_REASON.match(str((result.get(part) or {}).get("reason") or "")):
+            return False
+    return not str((result.get("enriched") or {}).get("raw") or "").startswith("Error:")
+
+
+class ProviderRecord(Base):
+    """
+    Last validation outcome per provider identity, shared across uploads.
+    """
+    __tablename__ = "provider_records"
+
+    identity = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False)
+    validated_at = Column(Float, nullable=False)
+    result = Column(Text, nullable=False)
+
+
+class ProviderStore:
+    """
+    Lets an upload skip rows that are unchanged since a recent run: rows whose identity and
+    input hash match a stored result younger than REVALIDATE_AFTER_DAYS reuse that result.
+    """
+    def __init__(self, store: ResultStore = None, max_age_days: float = None):
+        self.engine = (store or result_store).engine
+        self.max_age = (settings.REVALIDATE_AFTER_DAYS if max_age_days is None else max_age_days) * 86400
+        Base.metadata.create_all(self.engine, tables=[ProviderRecord.__table__])
+
+    def lookup(self, records):
+        """
+        Returns {position: stored_result} for records that are unchanged and fresh.
+        """
+        keys = {}
+        for i, record in enumerate(records):
+            identity = provider_identity(record)
+            if identity:
+                keys.setdefault(identity, []).append((i, content_hash(record)))
+        if not keys:
+            return {}
+
+        cutoff = time.time() - self.max_age
+        reusable = {}
+        with self.engine.connect() as conn:
+            identities = list(keys)
+            # stay well below SQLite's bound-parameter limit
+            for start in range(0, len(identities), 500):
+                rows = conn.execute(
+                    select(ProviderRecord.identity, ProviderRecord.content_hash, ProviderRecord.result)
+                    .where(ProviderRecord.identity.in_(identities[start:start + 500]),
+                           ProviderRecord.validated_at >= cutoff)
+                ).all()
+                for identity, stored_hash, result in rows:
+                    for i, row_hash in keys[identity]:
+                        if row_hash == stored_hash:
+                            reusable[i] = json.loads(result)
+        return reusable
+
+    def save(self, records, results):
+        """
+        Stores fresh results for the given input records (last one wins for repeated identities).
+        Results with transient failures are not stored, so those rows are validated again next time.
+        """
+        now = time.time()
+        rows = {}
+        for record, result in zip(records, results):
+            identity = provider_identity(record)
+            if identity and is_definitive(result):
+                stored = {k: v for k, v in result.items() if k != "record"}
+                rows[identity] = {
+                    "identity": identity,
+                    "content_hash": content_hash(record),
+                    "validated_at": now,
+                    "result": json.dumps(stored, default=str),
+                }
+        if not rows:
+            return
+        table = ProviderRecord.__table__
+        if self.engine.dialect.name == "sqlite":
+            stmt = sqlite_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["identity"],
+                set_={c: stmt.excluded[c] for c in ("content_hash", "validated_at", "result")},
+            )
+            with self.engine.begin() as conn:
+                conn.execute(stmt, list(rows.values()))
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.identity.in_(list(rows))))
+                conn.execute(table.insert(), list(rows.values()))
+
+
+provider_store = ProviderStore()
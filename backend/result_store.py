@@ -0,0 +1,126 @@
+import json
+from datetime import datetime
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Text, DateTime, Index, select, delete, func
+from sqlalchemy.orm import declarative_base, sessionmaker
+from config import settings
+
+Base = declarative_base()
+
+
+class TaskResultRow(Base):
+    """
+    One processed provider record of a task. Query columns are broken out;
+    the full result (api_data, website check, enrichment) lives in `payload`.
+    """
+    __tablename__ = "task_results"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(String, nullable=False)
+    row_index = Column(Integer, nullable=False)
+    npi = Column(String)
+    provider_name = Column(String)
+    validation_status = Column(String)
+    confidence_score = Column(Float)
+    payload = Column(Text, nullable=False)
+
+    __table_args__ = (Index("ix_task_results_task_row", "task_id", "row_index"),)
+
+
+class TaskReport(Base):
+    __tablename__ = "task_reports"
+
+    task_id = Column(String, primary_key=True)
+    processed = Column(Integer)
+    report = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ResultStore:
+    """
+    Persists per-task results outside the Celery result backend.
+    The task return value only keeps a summary and a pointer (the task id) into this store.
+    """
+    def __init__(self, url: str = None):
+        self.url = url or settings.RESULT_STORE_URL
+        connect_args = {"check_same_thread": False, "timeout": 30} if self.url.startswith("sqlite") else {}
+        self.engine = create_engine(self.url, connect_args=connect_args)
+
+        if self.url.startswith("sqlite"):
+            @event.listens_for(self.engine, "connect")
+            def _sqlite_pragmas(dbapi_conn, _):
+                # WAL lets the API read results while workers are still appending
+                dbapi_conn.execute("PRAGMA journal_mode=WAL")
+                dbapi_conn.execute("PRAGMA synchronous=NORMAL")
+
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def append(self, task_id: str, results, offset: int = 0):
+        """
+        Stores a batch of processed records starting at row `offset`.
+        """
+        rows = []
+        for i, item in enumerate(results):
+            record = item.get("record", {})
+            rows.append({
+                "task_id": task_id,
+                "row_index": offset + i,
+                "npi": str(record.get("npi")),
+                "provider_name": f"{record.get('first_name')} {record.get('last_name')}",
+                "validation_status": item.get("validation_status"),
+                "confidence_score": item.get("confidence_score"),
+                "payload": json.dumps(item, default=str),
+            })
+        if not rows:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(TaskResultRow.__table__.insert(), rows)
+
+    def save_report(self, task_id: str, processed: int, report: dict):
+        with self.Session() as session:
+            session.merge(TaskReport(task_id=task_id, processed=processed, report=json.dumps(report, default=str)))
+            session.commit()
+
+    def get_report(self, task_id: str):
+        with self.Session() as session:
+            row = session.get(TaskReport, task_id)
+            return json.loads(row.report) if row else None
+
+    def count(self, task_id: str):
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(func.count()).select_from(TaskResultRow).where(TaskResultRow.task_id == task_id)
+            ).scalar()
+
+    def iter_results(self, task_id: str, offset: int = 0, limit: int = None, status: str = None, batch_size: int = 1000):
+        """
+        Yields stored results in row order, fetching `batch_size` rows at a time (constant memory).
+        status optionally filters on validation_status (e.g. "Needs Review").
+        """
+        query = (
+            select(TaskResultRow.payload)
+            .where(TaskResultRow.task_id == task_id, TaskResultRow.row_index >= offset)
+            .order_by(TaskResultRow.row_index)
+        )
+        if status:
+            query = query.where(TaskResultRow.validation_status == status)
+        if limit is not None:
+            query = query.limit(limit)
+        with self.engine.connect() as conn:
+            rows = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+            for (payload,) in rows:
+                yield json.loads(payload)
+
+    def get_results(self, task_id: str, offset: int = 0, limit: int = 100):
+        return list(self.iter_results(task_id, offset=offset, limit=limit))
+
+    def clear(self, task_id: str):
+        """
+        Removes any rows from a previous (e.g. retried) run of the task.
+        """
+        with self.engine.begin() as conn:
+            conn.execute(delete(TaskResultRow).where(TaskResultRow.task_id == task_id))
+            conn.execute(delete(TaskReport).where(TaskReport.task_id == task_id))
+
+
+result_store = ResultStore()
@@ -38,37 +38,45 @@ function App() {
     useEffect(() => {
         if (!taskId) return;
 
-        const interval = setInterval(async () => {
+        // Server-Sent Events push compact progress snapshots; no polling of full results
+        const events = new EventSource(`${API_URL}/task/${taskId}/events`);
+
+        events.onmessage = async (event) => {
             try {
-                const res = await axios.get(`${API_URL}/task/${taskId}`);
-                const status = res.data.status;
-                const result = res.data.result;
+                const progress = JSON.parse(event.data);
+                const state = progress.state;
 
-                if (status === 'STARTED' || status === 'PROGRESS') {
+                if (state === 'STARTED' || state === 'PROGRESS') {
                     // Mapping 'step' metadata to visualization stages
-                    if (!result) return;
-                    const step = result.step || '';
+                    const step = progress.step || '';
 
                     if (step.includes('Map')) setStage(1);
                     if (step.includes('Validating')) setStage(2);
 
-                    if (result.details) {
-                        addLog("Validation Agent", `Processing ${result.details.first_name || 'record'}...`);
+                    if (progress.total) {
+                        setStats({ processed: progress.current || 0, valid: progress.valid || 0 });
                     }
-                } else if (status === 'SUCCESS') {
+                } else if (state === 'SUCCESS') {
                     setStage(5);
-                    setResultData(result.data);
+                    events.close();
+                    // Rows live in the result store; the task result only carries the summary
+                    const res = await axios.get(`${API_URL}/task/${taskId}`);
+                    const result = res.data.result;
+                    const rows = await axios.get(`${API_URL}/results/${taskId}`, { params: { limit: 500 } });
+                    setResultData(rows.data.data);
                     setReport(result.report);
-                    setStats({ processed: result.processed, valid: result.data.filter(r => r.validation_status === 'Valid').length });
-                    clearInterval(interval);
+                    setStats({ processed: result.processed, valid: result.report.valid_providers });
                     addLog("Orchestrator", "Pipeline finished successfully.");
+                } else if (state === 'FAILURE') {
+                    events.close();
+                    addLog("Orchestrator", progress.step || "Pipeline failed.");
                 }
             } catch (e) {
                 console.error(e);
             }
-        }, 1000);
+        };
 
-        return () => clearInterval(interval);
+        return () => events.close();
     }, [taskId]);
 
     return (
@@ -100,7 +108,7 @@ function App() {
                         <div className="border-2 border-dashed border-slate-700 rounded-xl p-12 text-center hover:border-indigo-500/50 transition-colors bg-slate-900/20">
                             <input
                                 type="file"
-                                accept=".csv,.pdf"
+                                accept=".csv,.gz,.zip,.pdf"
                                 onChange={(e) => setFile(e.target.files[0])}
                                 className="hidden"
                                 id="file"
@@ -1,5 +1,4 @@
 import React, { useState } from 'react';
-import axios from 'axios';
 import { MessageSquare, Send, X } from 'lucide-react';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8005';
@@ -21,11 +20,27 @@ const ChatInterface = ({ taskId }) => {
         setLoading(true);
 
         try {
-            const res = await axios.post(`${API_URL}/chat`, {
-                task_id: taskId,
-                message: userMsg
+            const res = await fetch(`${API_URL}/chat/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ task_id: taskId, message: userMsg })
             });
-            setMessages(prev => [...prev, { role: 'assistant', text: res.data.response }]);
+            if (!res.ok || !res.body) throw new Error(`Chat failed (${res.status})`);
+
+            // Append tokens to the last (assistant) message as they arrive
+            setMessages(prev => [...prev, { role: 'assistant', text: '' }]);
+            setLoading(false);
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                const chunk = decoder.decode(value, { stream: true });
+                setMessages(prev => {
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, text: last.text + chunk }];
+                });
+            }
         } catch (e) {
             setMessages(prev => [...prev, { role: 'assistant', text: "Sorry, I encountered an error." }]);
         } finally {
@@ -1,5 +1,15 @@
 import csv
+import os
 import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from agents.normalizer import npi_check_digit
+
+# Synthetic provider rosters:
+#   python generate_test_data.py [rows] [output.csv]
+# scripts/benchmark.py uses write_roster() with valid_npis=True so NPIs pass the check digit
+# and names match what the stub registry (scripts/stub_services.py) returns for them.
 
 # Constants
 SPECIALTIES = ['Cardiologist', 'Dermatologist', 'General Physician', 'Neurologist', 'Pediatrician', 'Orthopedic Surgeon']
@@ -8,50 +18,78 @@ CITIES_US = ['New York', 'Chicago', 'Los Angeles', 'Houston', 'Phoenix']
 FIRST_NAMES = ['Rajesh', 'Priya', 'Amit', 'Suresh', 'Deepa', 'John', 'Alice', 'Robert', 'Emily', 'Michael']
 LAST_NAMES = ['Sharma', 'Patel', 'Kumar', 'Singh', 'Reddy', 'Smith', 'Johnson', 'Williams', 'Brown', 'Jones']
 STATES = ['TNMC', 'UPMC', 'MHMC', 'DLMC', 'KA']
+HEADER = ['provider_id', 'full_name', 'registration_number', 'specialization', 'city', 'npi', 'website']
 
-def generate_indian_reg():
-    state = random.choice(STATES)
-    number = random.randint(10000, 99999)
+def generate_indian_reg(rng=random):
+    state = rng.choice(STATES)
+    number = rng.randint(10000, 99999)
     return f"{state}/{number}"
 
-def generate_us_npi():
-    return str(random.randint(1000000000, 9999999999))
-
-rows = []
-# Header
-rows.append(['provider_id', 'full_name', 'registration_number', 'specialization', 'city', 'npi', 'website'])
-
-for i in range(1, 301):
-    is_indian = random.choice([True, True, False]) # Bias towards Indian for this user
-    
-    fname = random.choice(FIRST_NAMES)
-    lname = random.choice(LAST_NAMES)
-    full_name = f"Dr. {fname} {lname}"
-    
-    specialty = random.choice(SPECIALTIES)
-    
-    if is_indian:
-        city = random.choice(CITIES_IN)
-        reg_no = generate_indian_reg()
-        npi = ""
-        website = f"https://{fname.lower()}{lname.lower()}.in"
-    else:
-        city = random.choice(CITIES_US)
-        reg_no = ""
-        npi = generate_us_npi()
-        website = f"https://{fname.lower()}{lname.lower()}.com"
-        
-    # Inject some errors (10% chance)
-    if random.random() < 0.1:
+def generate_us_npi(rng=random, valid: bool = False):
+    if not valid:
+        return str(rng.randint(1000000000, 9999999999))
+    first9 = str(rng.choice([1, 2])) + "".join(rng.choice("0123456789") for _ in range(8))
+    return first9 + npi_check_digit(first9)
+
+def names_for_npi(npi: str):
+    """
+    Deterministic (first, last) name for an NPI, shared with the stub registry.
+    """
+    n = int(npi[:9])
+    return FIRST_NAMES[n % len(FIRST_NAMES)], LAST_NAMES[n // len(FIRST_NAMES) % len(LAST_NAMES)]
+
+def generate_rows(count: int, seed: int = None, error_rate: float = 0.1, valid_npis: bool = False,
+                  website_base: str = None):
+    """
+    Yields `count` roster rows (without the header).
+    valid_npis: US NPIs carry a correct check digit and registry-consistent names.
+    website_base: websites become unique paths under this URL (e.g. a local stub server).
+    """
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        is_indian = rng.choice([True, True, False]) # Bias towards Indian for this user
+
+        fname = rng.choice(FIRST_NAMES)
+        lname = rng.choice(LAST_NAMES)
+        specialty = rng.choice(SPECIALTIES)
+
         if is_indian:
-            reg_no = "INVALID-ID"
+            city = rng.choice(CITIES_IN)
+            reg_no = generate_indian_reg(rng)
+            npi = ""
+            website = f"https://{fname.lower()}{lname.lower()}.in"
         else:
-            npi = "123" # too short
+            city = rng.choice(CITIES_US)
+            reg_no = ""
+            npi = generate_us_npi(rng, valid=valid_npis)
+            if valid_npis:
+                fname, lname = names_for_npi(npi)
+            website = f"https://{fname.lower()}{lname.lower()}.com"
+
+        if website_base:
+            website = f"{website_base.rstrip('/')}/{i}-{fname.lower()}{lname.lower()}"
+
+        # Inject some errors (10% chance by default)
+        if rng.random() < error_rate:
+            if is_indian:
+                reg_no = "INVALID-ID"
+            else:
+                npi = "123" # too short
 
-    rows.append([i, full_name, reg_no, specialty, city, npi, website])
+        yield [i, f"Dr. {fname} {lname}", reg_no, specialty, city, npi, website]
 
-with open('large_test_providers.csv', 'w', newline='', encoding='utf-8') as f:
-    writer = csv.writer(f)
-    writer.writerows(rows)
+def write_roster(path: str, count: int, **options):
+    """
+    Streams a roster of `count` rows to `path`; options are passed to generate_rows.
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(generate_rows(count, **options))
+    return count
 
-print(f"Generated {len(rows)-1} records in large_test_providers.csv")
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    output = sys.argv[2] if len(sys.argv) > 2 else 'large_test_providers.csv'
+    write_roster(output, count)
+    print(f"Generated {count} records in {output}")
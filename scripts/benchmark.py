@@ -0,0 +1,309 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT, "backend")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_test_data import write_roster
+from stub_services import add_stub_arguments, stubs_from_args
+
+# End-to-end pipeline benchmark against local stub services (no external network):
+#   python scripts/benchmark.py --sizes 1k,10k --latency-ms 50 --error-rate 0.01 --output bench.json
+#   python scripts/benchmark.py --sizes 1k --baseline bench.json   # compare with an earlier run
+# Each size runs in a fresh process (so peak RSS is per run) against a scratch Redis database
+# that is FLUSHED before every run. Rosters are regenerated from --seed for every run because
+# their website URLs point at this run's stub server.
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Per-row latencies kept for exact percentiles; larger runs keep a uniform sample of this size
+LATENCY_SAMPLE_SIZE = 200_000
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def peak_rss_bytes():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+class LatencyRecorder:
+    """
+    Exact per-row durations (a reservoir sample past `size` rows) for true percentiles: the shared
+    histogram's buckets are too coarse to show a 2x change within one bucket.
+    """
+    def __init__(self, size: int = LATENCY_SAMPLE_SIZE, seed: int = 0):
+        self.size = size
+        self.samples = []
+        self.count = 0
+        self.total = 0.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if len(self.samples) < self.size:
+                self.samples.append(seconds)
+            else:
+                slot = self._rng.randrange(self.count)
+                if slot < self.size:
+                    self.samples[slot] = seconds
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(time.perf_counter() - started)
+        return timed
+
+    def summary(self):
+        values = sorted(self.samples)
+
+        def percentile(q):
+            # linear interpolation between closest ranks
+            if not values:
+                return None
+            rank = q * (len(values) - 1)
+            low = int(rank)
+            high = min(low + 1, len(values) - 1)
+            return round(values[low] + (values[high] - values[low]) * (rank - low), 6)
+
+        return {
+            "validated_rows": self.count,
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            **{f"p{int(q * 100)}": percentile(q) for q in QUANTILES},
+        }
+
+
+def run_pipeline_once(roster: str, rows: int, env: dict, workdir: str, results):
+    """
+    Child process: points the backend at the stubs, runs one upload task eagerly and reports
+    wall time, per-row validation latency, stage timings, counters and peak RSS.
+    """
+    os.environ.update(env)
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    from celery_worker import process_upload_task
+    from metrics import metrics, FAMILIES
+    from agents.validation_pool import ValidationPool
+
+    latencies = LatencyRecorder()
+    ValidationPool.validate_record = latencies.wrap(ValidationPool.validate_record)
+
+    task_id = f"bench-{rows}"
+    started = time.perf_counter()
+    outcome = process_upload_task.apply(args=(roster, "csv"), kwargs={"fanout": False, "incremental": False},
+                                        task_id=task_id)
+    seconds = time.perf_counter() - started
+    if outcome.failed():
+        results.put({"rows": rows, "error": repr(outcome.result)})
+        return
+
+    counters = {}
+    for name, (kind, _) in FAMILIES.items():
+        if kind == "counter":
+            counters[name] = {labels or "total": value for labels, value in metrics.counter(name).items()}
+    results.put({
+        "rows": rows,
+        "processed": outcome.result["processed"],
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 2) if seconds else None,
+        "row_latency_seconds": latencies.summary(),
+        "stages": metrics.task_timings(task_id),
+        "counters": counters,
+        "peak_rss_bytes": peak_rss_bytes(),
+    })
+
+
+def redis_memory(client):
+    """
+    used_memory in bytes, or None where INFO is unavailable (some managed Redis deployments).
+    """
+    import redis
+    try:
+        return client.info("memory").get("used_memory")
+    except redis.ResponseError:
+        return None
+
+
+def run_size(args, stubs, rows: int):
+    import redis
+
+    run_dir = tempfile.mkdtemp(prefix=f"run_{rows}_", dir=args.workdir)
+    roster = os.path.join(run_dir, "roster.csv")
+    print(f"Generating {rows} rows -> {roster}")
+    write_roster(roster, rows, seed=args.seed, error_rate=args.row_error_rate, valid_npis=True,
+                 website_base=stubs.url("website"))
+    env = {
+        **stubs.env(),
+        "CELERY_BROKER_URL": args.redis_url,
+        "NPI_CACHE_REDIS_URL": args.redis_url,
+        "RESULT_STORE_URL": f"sqlite:///{os.path.join(run_dir, 'results.db')}",
+        "LLM_CACHE_BACKEND": "off",
+        "INCREMENTAL_VALIDATION": "false",
+        "HOST_RATE_LIMIT": str(args.host_rate_limit),
+        "VALIDATION_CONCURRENCY": str(args.concurrency),
+    }
+
+    client = redis.Redis.from_url(args.redis_url)
+    client.flushdb()
+    baseline_memory = redis_memory(client)
+    peak_memory = [baseline_memory]
+    running = threading.Event()
+    running.set()
+
+    def sample_redis():
+        while running.is_set():
+            peak_memory[0] = max(peak_memory[0], redis_memory(client) or 0)
+            time.sleep(0.25)
+
+    sampler = threading.Thread(target=sample_redis, daemon=True)
+    if baseline_memory is not None:
+        sampler.start()
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    child = ctx.Process(target=run_pipeline_once, args=(roster, rows, env, run_dir, results))
+    child.start()
+    try:
+        result = None
+        while result is None:
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if not child.is_alive():
+                    result = {"rows": rows, "error": f"benchmark process exited with code {child.exitcode}"}
+    finally:
+        child.join()
+        running.clear()
+        if sampler.is_alive():
+            sampler.join()
+        if not args.keep_files:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    if "error" in result:
+        return result
+    used_after = redis_memory(client)
+    result["redis"] = {
+        "used_memory_before_bytes": baseline_memory,
+        "used_memory_peak_bytes": max(peak_memory[0], used_after) if used_after is not None else None,
+        "used_memory_after_bytes": used_after,
+    }
+    return result
+
+
+def compare(current: dict, baseline: dict):
+    """
+    Prints throughput / latency / memory changes per size against a previous results file.
+    """
+    previous = {run["rows"]: run for run in baseline.get("runs", []) if "error" not in run}
+    print(f"\nCompared with {baseline.get('version') or 'baseline'} ({baseline.get('timestamp')}):")
+    for run in current["runs"]:
+        old = previous.get(run["rows"])
+        if not old or "error" in run:
+            continue
+        changes = []
+        for label, get in (
+            ("rows/s", lambda r: r["rows_per_sec"]),
+            ("p95", lambda r: r["row_latency_seconds"]["p95"]),
+            ("peak RSS", lambda r: r["peak_rss_bytes"]),
+        ):
+            new_value, old_value = get(run), get(old)
+            if new_value is not None and old_value:
+                changes.append(f"{label} {100.0 * (new_value - old_value) / old_value:+.1f}%")
+        print(f"  {run['rows']:>9} rows: " + ", ".join(changes))
+
+
+def print_run(run: dict):
+    if "error" in run:
+        print(f"{run['rows']:>9} rows: FAILED {run['error']}")
+        return
+    latency = run["row_latency_seconds"]
+    fmt = lambda v: f"{v * 1000:.0f}ms" if v is not None else "-"
+    redis_peak = run["redis"]["used_memory_peak_bytes"]
+    print(f"{run['rows']:>9} rows: {run['seconds']:.1f}s, {run['rows_per_sec']:.1f} rows/s, "
+          f"p50 {fmt(latency['p50'])} p95 {fmt(latency['p95'])} p99 {fmt(latency['p99'])}, "
+          f"peak RSS {run['peak_rss_bytes'] / 2**20:.0f} MiB, "
+          f"Redis peak {f'{redis_peak / 2**20:.1f} MiB' if redis_peak is not None else 'n/a'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark against local stub services.")
+    parser.add_argument("--sizes", default="1k,10k", help="Comma-separated roster sizes, e.g. 1k,10k,100k,1M")
+    add_stub_arguments(parser)
+    parser.add_argument("--row-error-rate", type=float, default=0.1, help="Share of malformed NPIs/registrations")
+    parser.add_argument("--concurrency", type=int, default=16, help="VALIDATION_CONCURRENCY for the run")
+    parser.add_argument("--host-rate-limit", type=float, default=0,
+                        help="HOST_RATE_LIMIT for the run (0 disables it: all stubs share one host)")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15",
+                        help="Scratch Redis database; it is flushed before every run")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "agenciai-bench"))
+    parser.add_argument("--keep-files", action="store_true", help="Keep each run's roster and result database")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    args = parser.parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+
+    stubs = stubs_from_args(args).start()
+    report = {
+        "version": git_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "seed": args.seed,
+            "row_error_rate": args.row_error_rate,
+            "concurrency": args.concurrency,
+            "host_rate_limit": args.host_rate_limit,
+            "stubs": {name: config.as_dict() for name, config in stubs.configs.items()},
+        },
+        "runs": [],
+    }
+    try:
+        for rows in [parse_size(s) for s in args.sizes.split(",") if s.strip()]:
+            run = run_size(args, stubs, rows)
+            print_run(run)
+            report["runs"].append(run)
+    finally:
+        stubs.stop()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
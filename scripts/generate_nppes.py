@@ -0,0 +1,48 @@
+import csv
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_test_data import FIRST_NAMES, LAST_NAMES, npi_check_digit
+
+# Synthetic NPPES dissemination file (subset of the real header) for testing the local NPI index:
+#   python scripts/generate_nppes.py [rows] [output.csv]
+#   cd backend && python -m agents.npi_index ../synthetic_nppes.csv
+
+TAXONOMIES = ['207RC0000X', '207N00000X', '208D00000X', '2084N0400X', '208000000X', '207X00000X']
+TAXONOMY_SLOTS = 3
+
+def generate_npi():
+    first9 = str(random.choice([1, 2])) + "".join(random.choice("0123456789") for _ in range(8))
+    return first9 + npi_check_digit(first9)
+
+def main(rows: int, path: str):
+    header = ['NPI', 'Entity Type Code', 'Provider Organization Name (Legal Business Name)',
+              'Provider Last Name (Legal Name)', 'Provider First Name', 'Last Update Date',
+              'NPI Deactivation Date', 'NPI Reactivation Date']
+    for slot in range(1, TAXONOMY_SLOTS + 1):
+        header += [f'Healthcare Provider Taxonomy Code_{slot}', f'Healthcare Provider Primary Taxonomy Switch_{slot}']
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for _ in range(rows):
+            deactivated = random.random() < 0.05
+            row = [
+                generate_npi(), '1', '',
+                random.choice(LAST_NAMES).upper(), random.choice(FIRST_NAMES).upper(),
+                f"{random.randint(1, 12):02d}/{random.randint(1, 28):02d}/{random.randint(2015, 2024)}",
+                "06/30/2023" if deactivated else "", "",
+            ]
+            primary = random.randrange(TAXONOMY_SLOTS)
+            for slot in range(TAXONOMY_SLOTS):
+                row += [random.choice(TAXONOMIES), 'Y' if slot == primary else 'N']
+            writer.writerow(row)
+
+    print(f"Generated {rows} NPPES records in {path}")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    output = sys.argv[2] if len(sys.argv) > 2 else 'synthetic_nppes.csv'
+    main(count, output)
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_test_data import names_for_npi
+
+# Local stand-ins for the NPI registry, provider websites and Ollama, for benchmarks and offline runs:
+#   python scripts/stub_services.py --latency-ms 80 --error-rate 0.01
+# then point the backend at them with the printed environment variables.
+
+TAXONOMIES = [('207RC0000X', 'Cardiovascular Disease'), ('207N00000X', 'Dermatology'),
+              ('208D00000X', 'General Practice'), ('2084N0400X', 'Neurology'),
+              ('208000000X', 'Pediatrics'), ('207X00000X', 'Orthopaedic Surgery')]
+
+
+class StubConfig:
+    """
+    Latency (mean and jitter, in ms) and error rate of one stub service.
+    """
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        seconds = max(0.0, self.latency_ms + jitter) / 1000
+        if seconds:
+            time.sleep(seconds)
+
+    def fails(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def as_dict(self):
+        return {"latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "error_rate": self.error_rate}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = StubConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, body, status: int = 200):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_status(self, status: int = 503):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class RegistryHandler(StubHandler):
+    """
+    NPI registry API: every NPI is found, with the names generate_test_data assigns to it;
+    about 5% are deactivated.
+    """
+    def do_GET(self):
+        self.config.delay()
+        if self.config.fails():
+            return self.send_error_status(503)
+        npi = parse_qs(urlparse(self.path).query).get("number", [""])[0]
+        if not npi.isdigit() or len(npi) != 10:
+            return self.send_json({"result_count": 0, "results": []})
+        first, last = names_for_npi(npi)
+        code, desc = TAXONOMIES[int(npi) % len(TAXONOMIES)]
+        self.send_json({"result_count": 1, "results": [{
+            "number": npi,
+            "basic": {
+                "first_name": first.upper(), "last_name": last.upper(),
+                "status": "D" if int(npi[-3:-1]) < 5 else "A", "last_updated": "2024-01-15",
+            },
+            "taxonomies": [{"code": code, "desc": desc, "primary": True}],
+        }]})
+
+
+class WebsiteHandler(StubHandler):
+    """
+    Provider websites: a small page at any path; failures answer 500.
+    """
+    page = b"<html><body><h1>Clinic</h1><p>Call (555) 010-2030 for appointments.</p></body></html>"
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def do_GET(self):
+        self._respond(head=False)
+
+    def _respond(self, head: bool):
+        self.config.delay()
+        if self.config.fails():
+            return self.send_error_status(500)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(self.page)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(self.page)
+
+
+class OllamaHandler(StubHandler):
+    """
+    Ollama /api/generate: answers packed enrichment prompts with one object per provider id,
+    any other prompt with a single enrichment object. Supports stream=true and token counts.
+    """
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.config.delay()
+        if self.config.fails():
+            return self.send_error_status(500)
+
+        prompt = body.get("prompt", "")
+        ids = [int(i) for i in re.findall(r'"id": (\d+)', prompt.split("Return")[0])]
+        item = {"specialties": ["Internal Medicine", "Cardiology", "Critical Care"], "certification": "ABIM"}
+        answer = json.dumps([{"id": i, **item} for i in ids] if ids else item)
+        stats = {"done": True, "prompt_eval_count": len(prompt) // 4, "eval_count": len(answer) // 4,
+                 "prompt_eval_duration": 1_000_000, "eval_duration": max(1, int(self.config.latency_ms * 1e6))}
+
+        if not body.get("stream"):
+            return self.send_json({"model": body.get("model"), "response": answer, **stats})
+        lines = [json.dumps({"response": answer[i:i + 16], "done": False}) for i in range(0, len(answer), 16)]
+        lines.append(json.dumps({"response": "", **stats}))
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubServices:
+    """
+    Runs the three stubs on background threads. `env()` returns the settings that point the backend at them.
+    """
+    def __init__(self, registry: StubConfig = None, website: StubConfig = None, llm: StubConfig = None,
+                 host: str = "127.0.0.1", ports=(0, 0, 0)):
+        self.host = host
+        self.configs = {"registry": registry or StubConfig(), "website": website or StubConfig(),
+                        "llm": llm or StubConfig()}
+        handlers = {"registry": RegistryHandler, "website": WebsiteHandler, "llm": OllamaHandler}
+        self.servers = {}
+        for (name, handler), port in zip(handlers.items(), ports):
+            bound = type(handler.__name__, (handler,), {"config": self.configs[name]})
+            self.servers[name] = ThreadingHTTPServer((host, port), bound)
+            self.servers[name].daemon_threads = True
+
+    def url(self, name: str) -> str:
+        return f"http://{self.host}:{self.servers[name].server_address[1]}"
+
+    def start(self):
+        for server in self.servers.values():
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def env(self):
+        return {
+            "NPI_REGISTRY_URL": self.url("registry") + "/api/",
+            "OLLAMA_BASE_URL": self.url("llm"),
+        }
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean latency of every stub")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Uniform +/- jitter around the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 5xx")
+    parser.add_argument("--registry-latency-ms", type=float, help="Override --latency-ms for the NPI registry")
+    parser.add_argument("--website-latency-ms", type=float, help="Override --latency-ms for websites")
+    parser.add_argument("--llm-latency-ms", type=float, help="Override --latency-ms for Ollama")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def stubs_from_args(args, ports=(0, 0, 0)):
+    def config(latency, offset):
+        return StubConfig(args.latency_ms if latency is None else latency, args.jitter_ms, args.error_rate,
+                          seed=args.seed + offset)
+    return StubServices(
+        registry=config(args.registry_latency_ms, 1),
+        website=config(args.website_latency_ms, 2),
+        llm=config(args.llm_latency_ms, 3),
+        ports=ports,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run local NPI registry, website and Ollama stubs.")
+    add_stub_arguments(parser)
+    parser.add_argument("--ports", default="8765,8768,8766", help="registry,website,ollama ports")
+    args = parser.parse_args()
+
+    stubs = stubs_from_args(args, ports=[int(p) for p in args.ports.split(",")]).start()
+    for key, value in stubs.env().items():
+        print(f"export {key}={value}")
+    print(f"# website base for generate_test_data.write_roster(website_base=...): {stubs.url('website')}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stubs.stop()
@@ -1,26 +1,39 @@
 import requests
 import io
+import time
 
 API_URL = "http://localhost:8000"
 
-def test_chat():
-    print("Testing Chat...")
-    try:
-        res = requests.post(f"{API_URL}/chat/", json={"query": "How many providers?"})
-        print(f"Chat Response: {res.json()}")
-    except Exception as e:
-        print(f"Chat Failed: {e}")
-
 def test_upload():
-    print("\nTesting CSV Upload...")
-    csv_content = "npi,first_name,last_name\n1234567890,Test,User"
-    file = {'file': ('test.csv', io.StringIO(csv_content), 'text/csv')}
+    print("Testing CSV Upload...")
+    csv_content = "npi,first_name,last_name\n1234567893,Test,User"
+    file = {'file': ('test.csv', io.BytesIO(csv_content.encode()), 'text/csv')}
     try:
-        res = requests.post(f"{API_URL}/upload-csv/", files=file)
+        res = requests.post(f"{API_URL}/upload", files=file)
         print(f"Upload Response: {res.json()}")
+        return res.json().get("task_id")
     except Exception as e:
         print(f"Upload Failed: {e}")
 
+def wait_for(task_id, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = requests.get(f"{API_URL}/task/{task_id}/progress").json().get("state")
+        if state in ("SUCCESS", "FAILURE"):
+            return state
+        time.sleep(1)
+    return "TIMEOUT"
+
+def test_chat(task_id):
+    print("\nTesting Chat...")
+    try:
+        res = requests.post(f"{API_URL}/chat", json={"task_id": task_id, "message": "How many providers?"})
+        print(f"Chat Response: {res.json()}")
+    except Exception as e:
+        print(f"Chat Failed: {e}")
+
 if __name__ == "__main__":
-    test_chat()
-    test_upload()
+    task_id = test_upload()
+    if task_id:
+        print(f"Task {task_id}: {wait_for(task_id)}")
+        test_chat(task_id)